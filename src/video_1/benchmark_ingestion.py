@@ -0,0 +1,296 @@
+"""
+This script benchmarks the different ways to ingest person profiles into Kùzu.
+
+It sweeps over row counts, ingestion strategies and thread counts, and writes a JSON and CSV
+report with the throughput (rows/s), peak RSS and on-disk database size of each run. Each run
+executes in a fresh subprocess, so that the peak RSS reported is that of the run alone.
+
+Example:
+    python benchmark_ingestion.py --rows 10000 100000 1000000 --threads 1 4 8
+"""
+
+import argparse
+import csv
+import json
+import os
+import resource
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import kuzu
+import polars as pl
+
+from bulk_writer import BulkWriter
+from csv_stream import copy_csv_in_batches
+from generate_data import generate_person_profiles, merge_csv_shards
+
+DATA_DIR = Path("data")
+DB_DIR = Path("bench_db")
+RESULTS_DIR = Path("results")
+
+STRATEGIES = [
+    "create",
+    "unwind",
+    "bulk_writer",
+    "csv_stream",
+    "load_from",
+    "copy_parallel",
+    "copy_serial",
+]
+# Row-at-a-time strategies take far too long at the top end of the sweep, so they're capped
+ROW_AT_A_TIME_STRATEGIES = {"create", "unwind"}
+
+PERSON_SCHEMA = {
+    "id": pl.String,
+    "name": pl.String,
+    "age": pl.Int64,
+    "net_worth": pl.Float64,
+    "email": pl.String,
+    "address": pl.String,
+    "phone": pl.String,
+    "comments": pl.String,
+}
+
+
+def get_dataset(num_rows: int) -> Path:
+    """Return the path to the CSV file for `num_rows` rows, generating it on first use."""
+    path = DATA_DIR / f"person_profiles_{num_rows}.csv"
+    if not path.exists():
+        shard_dir = DATA_DIR / f"person_profiles_{num_rows}_shards"
+        merge_csv_shards(generate_person_profiles(num_rows, shard_dir, "csv"), path)
+        shutil.rmtree(shard_dir)
+    return path
+
+
+def create_node_table(conn: kuzu.Connection) -> None:
+    conn.execute(
+        """
+        CREATE NODE TABLE Person (
+            id STRING,
+            name STRING,
+            age INT64,
+            net_worth DOUBLE,
+            email STRING,
+            address STRING,
+            phone STRING,
+            comments STRING,
+            PRIMARY KEY (id)
+        )
+        """
+    )
+
+
+def ingest_create(conn: kuzu.Connection, df: pl.DataFrame, batch_size: int) -> None:
+    # One CREATE per row, all inside a single transaction
+    conn.execute("BEGIN TRANSACTION")
+    for record in df.iter_rows(named=True):
+        conn.execute(
+            """
+            CREATE (person:Person {id: $id})
+            SET person.name = $name,
+                person.age = $age,
+                person.net_worth = $net_worth,
+                person.email = $email,
+                person.address = $address,
+                person.phone = $phone,
+                person.comments = $comments
+            """,
+            parameters=record,
+        )
+    conn.execute("COMMIT")
+
+
+def ingest_unwind(conn: kuzu.Connection, df: pl.DataFrame, batch_size: int) -> None:
+    # One CREATE per batch, passing the rows in as a list parameter
+    conn.execute("BEGIN TRANSACTION")
+    for batch in df.iter_slices(n_rows=batch_size):
+        conn.execute(
+            """
+            UNWIND $rows AS row
+            CREATE (person:Person {
+                id: row.id,
+                name: row.name,
+                age: row.age,
+                net_worth: row.net_worth,
+                email: row.email,
+                address: row.address,
+                phone: row.phone,
+                comments: row.comments
+            })
+            """,
+            parameters={"rows": batch.to_dicts()},
+        )
+    conn.execute("COMMIT")
+
+
+def ingest_bulk_writer(conn: kuzu.Connection, df: pl.DataFrame, batch_size: int) -> None:
+    # Records are written one at a time, but are copied in bulk once enough of them are buffered
+    with BulkWriter(conn, "Person", max_rows=batch_size) as writer:
+        for record in df.iter_rows(named=True):
+            writer.write(record)
+
+
+def ingest_load_from(conn: kuzu.Connection, df: pl.DataFrame, batch_size: int) -> None:
+    # Scan the in-memory Polars DataFrame directly
+    conn.execute(
+        """
+        LOAD FROM df
+        CREATE (person:Person {
+            id: id,
+            name: name,
+            age: age,
+            net_worth: net_worth,
+            email: email,
+            address: address,
+            phone: phone,
+            comments: comments
+        })
+        """
+    )
+
+
+def ingest_csv_stream(conn: kuzu.Connection, path: Path, batch_size: int) -> None:
+    # Stream the CSV file as Arrow record batches, so only one batch is held in memory at a time
+    copy_csv_in_batches(conn, "Person", path, batch_rows=batch_size)
+
+
+def ingest_copy(conn: kuzu.Connection, path: Path, parallel: bool) -> None:
+    options = f"header = true, delim = '|', parallel = {str(parallel).lower()}"
+    conn.execute(f"COPY Person FROM '{path}' ({options})")
+
+
+def get_disk_size(path: Path) -> int:
+    """
+    Return the size in bytes of a database, which is a single file in newer versions of Kùzu,
+    including any changes still in its write-ahead log (WAL).
+    """
+    if path.is_file():
+        wal_path = path.with_name(f"{path.name}.wal")
+        return path.stat().st_size + (wal_path.stat().st_size if wal_path.exists() else 0)
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def remove_database(path: Path) -> None:
+    if path.is_file():
+        path.unlink()
+        path.with_name(f"{path.name}.wal").unlink(missing_ok=True)
+    else:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def get_peak_rss_mb() -> float:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def run_single(strategy: str, num_rows: int, num_threads: int, batch_size: int) -> dict:
+    """Run a single benchmark configuration. Meant to be called in a fresh subprocess."""
+    path = get_dataset(num_rows)
+    db_path = DB_DIR / f"{strategy}_{num_rows}_{num_threads}"
+    remove_database(db_path)
+    db = kuzu.Database(str(db_path))
+    conn = kuzu.Connection(db, num_threads=num_threads)
+    create_node_table(conn)
+
+    # Strategies that ingest from Python read the data up front, outside of the timed region
+    df = None
+    if strategy in {"create", "unwind", "bulk_writer", "load_from"}:
+        df = pl.read_csv(path, separator="|", schema_overrides=PERSON_SCHEMA)
+
+    start = time.perf_counter()
+    if strategy == "create":
+        ingest_create(conn, df, batch_size)
+    elif strategy == "unwind":
+        ingest_unwind(conn, df, batch_size)
+    elif strategy == "bulk_writer":
+        ingest_bulk_writer(conn, df, batch_size)
+    elif strategy == "csv_stream":
+        ingest_csv_stream(conn, path, batch_size)
+    elif strategy == "load_from":
+        ingest_load_from(conn, df, batch_size)
+    else:
+        ingest_copy(conn, path, parallel=strategy == "copy_parallel")
+    elapsed = time.perf_counter() - start
+
+    num_ingested = conn.execute("MATCH (p:Person) RETURN count(p)").get_next()[0]
+    assert num_ingested == num_rows, f"Expected {num_rows} rows, found {num_ingested}"
+    # Close the database, which checkpoints the WAL, so that the measured size is comparable
+    conn.close()
+    db.close()
+
+    result = {
+        "kuzu_version": kuzu.__version__,
+        "strategy": strategy,
+        "num_rows": num_rows,
+        "num_threads": num_threads,
+        "batch_size": batch_size,
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(num_rows / elapsed, 1),
+        "peak_rss_mb": round(get_peak_rss_mb(), 1),
+        "db_size_mb": round(get_disk_size(db_path) / (1024 * 1024), 2),
+    }
+    remove_database(db_path)
+    return result
+
+
+def write_report(results: list[dict], name: str) -> None:
+    RESULTS_DIR.mkdir(exist_ok=True)
+    with open(RESULTS_DIR / f"{name}.json", "w") as f:
+        json.dump(results, f, indent=2)
+    with open(RESULTS_DIR / f"{name}.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=results[0].keys())
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"Wrote report to {RESULTS_DIR / name}.json and {RESULTS_DIR / name}.csv")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000, 10_000_000]
+    )
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=STRATEGIES)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, os.cpu_count()])
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument(
+        "--max-row-at-a-time-rows",
+        type=int,
+        default=100_000,
+        help="Skip the create and unwind strategies for row counts above this",
+    )
+    parser.add_argument("--output", default="ingestion_benchmark")
+    args = parser.parse_args()
+
+    DATA_DIR.mkdir(exist_ok=True)
+    DB_DIR.mkdir(exist_ok=True)
+    # Generate the datasets once in this process, so that the workers don't race to create them
+    for num_rows in args.rows:
+        get_dataset(num_rows)
+
+    results = []
+    for num_rows in args.rows:
+        for strategy in args.strategies:
+            if strategy in ROW_AT_A_TIME_STRATEGIES and num_rows > args.max_row_at_a_time_rows:
+                print(f"Skipping {strategy} for {num_rows} rows")
+                continue
+            for num_threads in args.threads:
+                with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                    result = pool.submit(
+                        run_single, strategy, num_rows, num_threads, args.batch_size
+                    ).result()
+                print(
+                    f"{strategy:>14} | {num_rows:>10} rows | {num_threads:>3} threads | "
+                    f"{result['rows_per_sec']:>12,.0f} rows/s | {result['peak_rss_mb']:>8} MB RSS"
+                )
+                results.append(result)
+
+    write_report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+A bulk writer that buffers records as Arrow record batches and ingests them via `COPY FROM`.
+
+Calling `conn.execute` once per record incurs a Python -> C++ round trip and a full query
+compilation for every single row. `BulkWriter` instead accumulates the incoming dicts into
+columnar Arrow record batches, and flushes them into the node or relationship table with a single
+`COPY` statement once a row or byte threshold is reached.
+
+Example:
+    with BulkWriter(conn, "Person", max_rows=100_000) as writer:
+        for record in records:
+            writer.write(record)
+    print(writer.flush_stats)
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+import kuzu
+import pyarrow as pa
+
+
+@dataclass
+class FlushStats:
+    num_rows: int
+    num_bytes: int
+    seconds: float
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.num_rows / self.seconds if self.seconds > 0 else float("inf")
+
+
+class BulkWriter:
+    def __init__(
+        self,
+        conn: kuzu.Connection,
+        table: str,
+        schema: pa.Schema | None = None,
+        max_rows: int = 100_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        batch_rows: int = 8192,
+    ) -> None:
+        """
+        Args:
+            conn: Connection to the Kùzu database to write to.
+            table: Name of the node or relationship table to copy the records into. The record
+                fields must be in the same order as the table's columns (for relationship
+                tables, the FROM and TO primary keys come first).
+            schema: Arrow schema of the records. If not provided, it's inferred from each batch
+                of records, and widened as later batches need it, e.g. from `null` (a column with
+                no values yet) or `int64` to `double`. The buffered batches are cast to the widened
+                schema when they're flushed.
+            max_rows: Flush once this many rows are buffered.
+            max_bytes: Flush once the buffered record batches take up this many bytes.
+            batch_rows: Number of records accumulated in Python lists before they're converted
+                into a columnar Arrow record batch.
+        """
+        self.conn = conn
+        self.table = table
+        self.schema = schema
+        self._infer_schema = schema is None
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        # Seal record batches no larger than a flush, so that `max_rows` is respected
+        self.batch_rows = min(batch_rows, max_rows)
+        self.flush_stats: list[FlushStats] = []
+        self._columns: dict[str, list[Any]] = (
+            {name: [] for name in schema.names} if schema is not None else {}
+        )
+        self._num_pending = 0
+        self._batches: list[pa.RecordBatch] = []
+        self._num_buffered_rows = 0
+        self._num_buffered_bytes = 0
+        self._closed = False
+
+    def __enter__(self) -> "BulkWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # Don't write out a partial buffer if the caller failed midway
+        if exc_type is None:
+            self.close()
+        else:
+            self._closed = True
+
+    def write(self, record: dict[str, Any]) -> None:
+        if self._closed:
+            raise RuntimeError("Cannot write to a closed BulkWriter")
+        if not self._columns:
+            self._columns = {name: [] for name in record}
+        for name, values in self._columns.items():
+            values.append(record.get(name))
+        self._num_pending += 1
+        if self._num_pending >= self.batch_rows:
+            self._seal_batch()
+            self._maybe_flush()
+
+    def write_many(self, records: Iterable[dict[str, Any]]) -> None:
+        for record in records:
+            self.write(record)
+
+    def write_batch(self, batch: pa.RecordBatch) -> None:
+        """Buffer an already columnar Arrow record batch, skipping the per-record conversion."""
+        if self._closed:
+            raise RuntimeError("Cannot write to a closed BulkWriter")
+        self._seal_batch()
+        if self._infer_schema:
+            self._widen_schema(batch.schema)
+        elif batch.schema != self.schema:
+            batch = batch.cast(self.schema)
+        self._append_batch(batch)
+        self._maybe_flush()
+
+    def flush(self) -> FlushStats | None:
+        """Copy all buffered records into the table, returning the timing of the flush."""
+        self._seal_batch()
+        if not self._batches:
+            return None
+        # Batches sealed before the schema was widened still have the narrower types
+        batches = [
+            batch if batch.schema == self.schema else batch.cast(self.schema)
+            for batch in self._batches
+        ]
+        arrow_table = pa.Table.from_batches(batches, schema=self.schema)
+        start = time.perf_counter()
+        self.conn.execute(f"COPY {self.table} FROM arrow_table")
+        stats = FlushStats(
+            num_rows=self._num_buffered_rows,
+            num_bytes=self._num_buffered_bytes,
+            seconds=time.perf_counter() - start,
+        )
+        self.flush_stats.append(stats)
+        self._batches = []
+        self._num_buffered_rows = 0
+        self._num_buffered_bytes = 0
+        return stats
+
+    def close(self) -> None:
+        if not self._closed:
+            self.flush()
+            self._closed = True
+
+    @property
+    def num_rows_written(self) -> int:
+        return sum(stats.num_rows for stats in self.flush_stats)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(stats.seconds for stats in self.flush_stats)
+
+    def _seal_batch(self) -> None:
+        """Convert the records accumulated in Python lists into a columnar record batch."""
+        if self._num_pending == 0:
+            return
+        if self._infer_schema:
+            batch = pa.RecordBatch.from_pydict(self._columns)
+            self._widen_schema(batch.schema)
+        else:
+            batch = pa.RecordBatch.from_pydict(self._columns, schema=self.schema)
+        self._columns = {name: [] for name in self._columns}
+        self._num_pending = 0
+        self._append_batch(batch)
+
+    def _widen_schema(self, schema: pa.Schema) -> None:
+        """Widen the inferred schema so that it can also hold a batch with the given schema."""
+        if self.schema is None:
+            self.schema = schema
+        elif schema != self.schema:
+            self.schema = pa.unify_schemas([self.schema, schema], promote_options="permissive")
+
+    def _append_batch(self, batch: pa.RecordBatch) -> None:
+        self._batches.append(batch)
+        self._num_buffered_rows += batch.num_rows
+        self._num_buffered_bytes += batch.nbytes
+
+    def _maybe_flush(self) -> None:
+        if self._num_buffered_rows >= self.max_rows or self._num_buffered_bytes >= self.max_bytes:
+            self.flush()
@@ -0,0 +1,87 @@
+"""
+Stream a large CSV file as Arrow record batches, and ingest them into Kùzu batch by batch.
+
+Reading the whole file into a list of dicts holds every row as Python objects at once. Instead,
+PyArrow's streaming CSV reader parses the file one block at a time, and converts each column to
+its target type in a single vectorized pass, so the peak memory stays flat regardless of the
+size of the file.
+
+Example:
+    for batch in read_csv_batches("data/person_profiles.csv", batch_rows=100_000):
+        print(batch.num_rows)
+"""
+
+from pathlib import Path
+from typing import Iterator
+
+import kuzu
+import pyarrow as pa
+import pyarrow.csv as pv
+
+from bulk_writer import BulkWriter, FlushStats
+
+# Column types for `data/person_profiles.csv`, matching the Person node table
+PERSON_COLUMN_TYPES = {
+    "id": pa.string(),
+    "name": pa.string(),
+    "age": pa.int64(),
+    "net_worth": pa.float64(),
+    "email": pa.string(),
+    "address": pa.string(),
+    "phone": pa.string(),
+    "comments": pa.string(),
+}
+
+
+def read_csv_batches(
+    path: str | Path,
+    batch_rows: int = 100_000,
+    delimiter: str = "|",
+    column_types: dict[str, pa.DataType] = PERSON_COLUMN_TYPES,
+    block_size: int = 16 * 1024 * 1024,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Yield record batches of exactly `batch_rows` rows (except for the last one) from a CSV file.
+
+    Args:
+        path: Path to the CSV file, which must have a header row.
+        batch_rows: Number of rows in each yielded record batch.
+        delimiter: Field delimiter of the CSV file.
+        column_types: Arrow type of each column. Columns not listed here are type-inferred.
+        block_size: Number of bytes the reader parses at a time, which bounds its memory usage.
+    """
+    reader = pv.open_csv(
+        path,
+        read_options=pv.ReadOptions(block_size=block_size),
+        parse_options=pv.ParseOptions(delimiter=delimiter, newlines_in_values=True),
+        convert_options=pv.ConvertOptions(column_types=column_types),
+    )
+    # The reader's batches are sized in bytes, so re-slice them into batches of `batch_rows` rows
+    pending: list[pa.RecordBatch] = []
+    num_pending = 0
+    for batch in reader:
+        pending.append(batch)
+        num_pending += batch.num_rows
+        while num_pending >= batch_rows:
+            combined = pa.Table.from_batches(pending).combine_chunks().to_batches()[0]
+            yield combined.slice(0, batch_rows)
+            remainder = combined.slice(batch_rows)
+            pending = [remainder] if remainder.num_rows > 0 else []
+            num_pending = remainder.num_rows
+    if num_pending > 0:
+        yield pa.Table.from_batches(pending).combine_chunks().to_batches()[0]
+
+
+def copy_csv_in_batches(
+    conn: kuzu.Connection,
+    table: str,
+    path: str | Path,
+    batch_rows: int = 100_000,
+    delimiter: str = "|",
+    column_types: dict[str, pa.DataType] = PERSON_COLUMN_TYPES,
+) -> list[FlushStats]:
+    """Ingest a CSV file into `table` one record batch at a time, returning per-batch timings."""
+    with BulkWriter(conn, table, max_rows=batch_rows) as writer:
+        for batch in read_csv_batches(path, batch_rows, delimiter, column_types):
+            writer.write_batch(batch)
+    return writer.flush_stats
@@ -0,0 +1,172 @@
+"""
+Generate synthetic person profiles in parallel, for use as large ingestion benchmark fixtures.
+
+Calling Faker once per field per row is slower than ingesting the data it produces. Instead, Faker
+is only used up front to build small pools of realistic strings. Each shard of the row range is
+then generated in a separate process, with the numeric columns drawn using NumPy and the string
+columns sampled from the pools in vectorized form. Every shard has its own seed derived from the
+global seed and the shard index, so the same data is produced on every run, regardless of the
+number of worker processes.
+
+Example:
+    python generate_data.py --rows 10000000 --format parquet --output data/person_profiles
+"""
+
+import argparse
+import random
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+from faker import Faker
+from faker.providers.person.en import Provider
+
+SEED = 37
+SHARD_ROWS = 1_000_000
+POOL_SIZE = 1000
+
+
+def get_first_names() -> list[str]:
+    # Sort the names before shuffling, since the iteration order of a set isn't deterministic
+    rng = random.Random(SEED)
+    first_names = sorted(set(Provider.first_names))
+    rng.shuffle(first_names)
+    return first_names
+
+
+def get_string_pools(pool_size: int = POOL_SIZE) -> dict[str, list[str]]:
+    """Build pools of fake strings, from which the string columns are sampled."""
+    Faker.seed(SEED)
+    fake = Faker()
+    return {
+        "first_name": get_first_names(),
+        "domain_word": [fake.domain_word() for _ in range(pool_size)],
+        "email_domain": sorted(set(fake.free_email_domain() for _ in range(pool_size))),
+        "street": [fake.street_address() for _ in range(pool_size)],
+        "city": [f"{fake.city()}, {fake.state_abbr()} {fake.postcode()}" for _ in range(pool_size)],
+        # Newlines are replaced, since the parallel CSV reader doesn't support quoted newlines
+        "comments": [fake.text(max_nb_chars=200).replace("\n", " ") for _ in range(pool_size)],
+    }
+
+
+def sample(rng: np.random.Generator, pool: list[str], num_rows: int) -> pl.Series:
+    return pl.Series(pool).gather(rng.integers(0, len(pool), num_rows))
+
+
+def generate_shard(
+    shard_index: int, start: int, end: int, pools: dict[str, list[str]]
+) -> pl.DataFrame:
+    """Generate the profiles with ids in the range [start + 1, end]."""
+    rng = np.random.default_rng([SEED, shard_index])
+    num_rows = end - start
+    df = pl.DataFrame(
+        {
+            "id": np.arange(start + 1, end + 1),
+            "name": sample(rng, pools["first_name"], num_rows),
+            "age": rng.integers(18, 76, num_rows),
+            "net_worth": np.round(rng.uniform(10245, 100_321_251, num_rows), 2),
+            "domain_word": sample(rng, pools["domain_word"], num_rows),
+            "email_domain": sample(rng, pools["email_domain"], num_rows),
+            "street": sample(rng, pools["street"], num_rows),
+            "city": sample(rng, pools["city"], num_rows),
+            "area_code": rng.integers(200, 1000, num_rows),
+            "exchange": rng.integers(200, 1000, num_rows),
+            "line": rng.integers(0, 10000, num_rows),
+            "comments": sample(rng, pools["comments"], num_rows),
+        }
+    )
+    return df.select(
+        pl.col("id").cast(pl.String),
+        "name",
+        "age",
+        "net_worth",
+        pl.concat_str(["domain_word", "email_domain"], separator="@").alias("email"),
+        pl.concat_str(["street", "city"], separator=", ").alias("address"),
+        pl.concat_str(
+            [
+                pl.col("area_code").cast(pl.String),
+                pl.col("exchange").cast(pl.String),
+                pl.col("line").cast(pl.String).str.zfill(4),
+            ],
+            separator="-",
+        ).alias("phone"),
+        "comments",
+    )
+
+
+def write_shard(
+    shard_index: int, start: int, end: int, pools: dict[str, list[str]], output: Path, fmt: str
+) -> Path:
+    df = generate_shard(shard_index, start, end, pools)
+    path = output / f"part-{shard_index:05d}.{fmt}"
+    if fmt == "parquet":
+        df.write_parquet(path)
+    else:
+        df.write_csv(path, separator="|")
+    return path
+
+
+def generate_person_profiles(
+    num_rows: int,
+    output: str | Path,
+    fmt: str = "csv",
+    num_workers: int | None = None,
+    shard_rows: int = SHARD_ROWS,
+) -> list[Path]:
+    """
+    Write `num_rows` person profiles as CSV or Parquet shards to the `output` directory.
+
+    Args:
+        num_rows: Total number of profiles to generate.
+        output: Directory to write the shards to. Any existing shards are removed.
+        fmt: Either "csv" (pipe-delimited, with a header) or "parquet".
+        num_workers: Number of worker processes. Defaults to the number of CPUs.
+        shard_rows: Number of rows per shard. Changing this changes the generated data.
+    """
+    output = Path(output)
+    shutil.rmtree(output, ignore_errors=True)
+    output.mkdir(parents=True)
+    pools = get_string_pools()
+    ranges = [
+        (start, min(start + shard_rows, num_rows)) for start in range(0, num_rows, shard_rows)
+    ]
+    with ProcessPoolExecutor(max_workers=num_workers) as pool:
+        futures = [
+            pool.submit(write_shard, i, start, end, pools, output, fmt)
+            for i, (start, end) in enumerate(ranges)
+        ]
+        return [future.result() for future in futures]
+
+
+def merge_csv_shards(paths: list[Path], output: str | Path) -> None:
+    """Concatenate CSV shards into a single file, keeping only the header of the first shard."""
+    with open(output, "wb") as out:
+        for i, path in enumerate(paths):
+            with open(path, "rb") as f:
+                if i > 0:
+                    f.readline()
+                shutil.copyfileobj(f, out)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="parquet")
+    parser.add_argument("--output", default="data/person_profiles")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--shard-rows", type=int, default=SHARD_ROWS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    paths = generate_person_profiles(
+        args.rows, args.output, args.format, args.workers, args.shard_rows
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Generated {args.rows} person profiles in {len(paths)} shards in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Generate a scaled-up version of the Person/City/Follows/LivesIn dataset for benchmarking.
+
+The files are written without headers, in the same format as the ones in `data/`, so they can be
+ingested by both the Python and the Rust benchmark runners with the same `COPY` statements.
+
+Example:
+    python generate_data.py --persons 1000000 --cities 10000 --follows-per-person 20
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+SEED = 37
+
+
+def generate_data(
+    output: str | Path, num_persons: int, num_cities: int, follows_per_person: int
+) -> None:
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(SEED)
+
+    persons = pl.DataFrame(
+        {
+            "name": [f"Person_{i}" for i in range(num_persons)],
+            "age": rng.integers(18, 80, num_persons),
+        }
+    )
+    # Skew the city populations so that only a fraction of them pass the query 1 threshold
+    cities = pl.DataFrame(
+        {
+            "name": [f"City_{i}" for i in range(num_cities)],
+            "population": rng.lognormal(mean=12, sigma=1.5, size=num_cities).astype(np.int64),
+        }
+    )
+    # Pick the followed persons from a Zipf distribution, so that there are a few very popular ones
+    num_follows = num_persons * follows_per_person
+    follows = pl.DataFrame(
+        {
+            "from": persons["name"].gather(rng.integers(0, num_persons, num_follows)),
+            "to": persons["name"].gather((rng.zipf(1.5, num_follows) - 1) % num_persons),
+        }
+    ).unique().filter(pl.col("from") != pl.col("to"))
+    lives_in = pl.DataFrame(
+        {
+            "from": persons["name"],
+            "to": cities["name"].gather(rng.integers(0, num_cities, num_persons)),
+        }
+    )
+
+    for name, df in [
+        ("person", persons),
+        ("city", cities),
+        ("follows", follows),
+        ("lives_in", lives_in),
+    ]:
+        df.write_csv(output / f"{name}.csv", include_header=False)
+    print(
+        f"Wrote {num_persons} persons, {num_cities} cities, {follows.height} follows and "
+        f"{lives_in.height} lives_in edges to {output}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--output", default="data/scaled")
+    parser.add_argument("--persons", type=int, default=1_000_000)
+    parser.add_argument("--cities", type=int, default=10_000)
+    parser.add_argument("--follows-per-person", type=int, default=20)
+    args = parser.parse_args()
+    generate_data(args.output, args.persons, args.cities, args.follows_per_person)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measure the latency of the video_2 queries through the Python API.
+
+Each query is run a number of warmup times, followed by a number of timed runs. For every timed
+run, the time spent in `conn.execute` (compiling and executing the query) is recorded separately
+from the time spent materializing the result rows as Python objects.
+
+This script is usually invoked by `../run_benchmark.py`, which also runs the Rust equivalent.
+"""
+
+import argparse
+import json
+import shutil
+import time
+from pathlib import Path
+
+import kuzu
+
+
+def create_database(db_path: str, data_dir: str) -> kuzu.Connection:
+    # Newer versions of Kùzu store the database in a single file rather than a directory
+    if Path(db_path).is_file():
+        Path(db_path).unlink()
+    shutil.rmtree(db_path, ignore_errors=True)
+    db = kuzu.Database(db_path)
+    conn = kuzu.Connection(db)
+
+    conn.execute("CREATE NODE TABLE Person(name STRING, age INT64, PRIMARY KEY (name))")
+    conn.execute("CREATE NODE TABLE City(name STRING, population INT64, PRIMARY KEY (name))")
+    conn.execute("CREATE REL TABLE Follows(FROM Person TO Person)")
+    conn.execute("CREATE REL TABLE LivesIn(FROM Person TO City)")
+
+    conn.execute(f"COPY Person FROM '{data_dir}/person.csv'")
+    conn.execute(f"COPY City FROM '{data_dir}/city.csv'")
+    conn.execute(f"COPY Follows FROM '{data_dir}/follows.csv'")
+    conn.execute(f"COPY LivesIn FROM '{data_dir}/lives_in.csv'")
+    return conn
+
+
+def time_query(conn: kuzu.Connection, query: str) -> dict:
+    start = time.perf_counter()
+    result = conn.execute(query)
+    executed = time.perf_counter()
+    num_rows = 0
+    while result.has_next():
+        result.get_next()
+        num_rows += 1
+    materialized = time.perf_counter()
+    return {
+        "execute_ms": (executed - start) * 1000,
+        "materialize_ms": (materialized - executed) * 1000,
+        "total_ms": (materialized - start) * 1000,
+        "num_rows": num_rows,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--data", default="../data/scaled")
+    parser.add_argument("--queries", nargs="+", default=["../q1.cypher", "../q2.cypher"])
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--output", default="benchmark_python.json")
+    args = parser.parse_args()
+
+    conn = create_database("./bench_db", args.data)
+
+    samples = []
+    for query_path in map(Path, args.queries):
+        query = query_path.read_text()
+        for _ in range(args.warmup):
+            time_query(conn, query)
+        for run in range(args.runs):
+            sample = time_query(conn, query)
+            samples.append({"binding": "python", "query": query_path.stem, "run": run, **sample})
+
+    with open(args.output, "w") as f:
+        json.dump(samples, f)
+    print(f"Wrote {len(samples)} Python samples to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
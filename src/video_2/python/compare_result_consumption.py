@@ -0,0 +1,76 @@
+"""
+Compare the cost of consuming large query results row by row versus as Arrow record batches.
+
+The database is built from the scaled-up dataset generated by `../generate_data.py`.
+
+Example:
+    python compare_result_consumption.py --data ../data/scaled --chunk-size 100000
+"""
+
+import argparse
+import time
+
+import kuzu
+
+from benchmark import create_database
+from results import iter_arrow_batches, iter_rows, to_polars
+
+QUERIES = {
+    "population": (
+        """
+        MATCH (p:Person)-[:LivesIn]->(c:City)
+        WHERE c.population > $min_population
+        RETURN p.name AS person, p.age AS age, c.name AS city, c.population AS population
+        """,
+        {"min_population": 1_000_000},
+    ),
+    "followers": (
+        """
+        MATCH (:Person)-[f:Follows]->(p2:Person)
+        RETURN p2.name AS person, count(f) AS num_followers
+        """,
+        {},
+    ),
+}
+
+
+def consume_rows(conn: kuzu.Connection, query: str, parameters: dict, chunk_size: int) -> int:
+    result = conn.execute(query, parameters=parameters)
+    return sum(1 for _ in iter_rows(result))
+
+
+def consume_arrow(conn: kuzu.Connection, query: str, parameters: dict, chunk_size: int) -> int:
+    result = conn.execute(query, parameters=parameters)
+    return sum(batch.num_rows for batch in iter_arrow_batches(result, chunk_size))
+
+
+def consume_polars(conn: kuzu.Connection, query: str, parameters: dict, chunk_size: int) -> int:
+    result = conn.execute(query, parameters=parameters)
+    return to_polars(result, chunk_size).height
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--data", default="../data/scaled")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = create_database("./bench_db", args.data)
+    print(f"{'query':<12} {'method':<8} {'rows':>10} {'best (ms)':>12}")
+    for name, (query, parameters) in QUERIES.items():
+        for method, consume in [
+            ("rows", consume_rows),
+            ("arrow", consume_arrow),
+            ("polars", consume_polars),
+        ]:
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                num_rows = consume(conn, query, parameters, args.chunk_size)
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{name:<12} {method:<8} {num_rows:>10} {min(timings):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
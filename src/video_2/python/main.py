@@ -2,6 +2,9 @@ import shutil
 
 import kuzu
 
+from results import to_polars
+from statement_cache import CachedConnection
+
 
 def main() -> None:
     # Initialize database
@@ -21,19 +24,23 @@ def main() -> None:
     conn.execute("COPY Follows FROM '../data/follows.csv'")
     conn.execute("COPY LivesIn FROM '../data/lives_in.csv'")
 
-    # Run query 1
-    response1 = conn.execute(
-        """
-        MATCH (c:City)
-        WHERE c.population > $min_population
-        RETURN c.name AS city, c.population AS population
-        ORDER BY population DESC
-        """,
-        parameters={"min_population": 1_000_000},
-    )
-    while response1.has_next():
-        r1 = response1.get_next()
-        print(f"{r1[0]} has a population of {r1[1]}")
+    # Queries run through the cached connection are only parsed and planned the first time
+    cached_conn = CachedConnection(conn)
+
+    # Run query 1 for a few different thresholds
+    for min_population in [1_000_000, 500_000]:
+        response1 = cached_conn.execute(
+            """
+            MATCH (c:City)
+            WHERE c.population > $min_population
+            RETURN c.name AS city, c.population AS population
+            ORDER BY population DESC
+            """,
+            parameters={"min_population": min_population},
+        )
+        # Fetch the result as a Polars DataFrame via Arrow, rather than one Python list per row
+        cities = to_polars(response1)
+        print(f"Cities with a population over {min_population}:\n{cities}")
 
     # Run query 2
     response2 = conn.execute(
@@ -46,6 +53,8 @@ def main() -> None:
     r2 = response2.get_next()
     print(f"{r2[0]} has the most followers: {r2[1]}")
 
+    print(f"Prepared statement cache: {cached_conn.cache_info()}")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,38 @@
+"""
+Helpers to consume Kùzu query results as Arrow record batches instead of one row at a time.
+
+Iterating over a result with `has_next()`/`get_next()` builds a Python list for every row, which
+dominates the cost of scanning large results. These helpers instead convert the result into Arrow
+record batches of a configurable size, which can be handed over to Polars without copying.
+"""
+
+from typing import Iterator
+
+import kuzu
+import polars as pl
+import pyarrow as pa
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+def iter_arrow_batches(
+    result: kuzu.QueryResult, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[pa.RecordBatch]:
+    """
+    Yield the rows of a query result as Arrow record batches of up to `chunk_size` rows.
+
+    `get_as_arrow` materializes the whole result as an Arrow table before the first batch is
+    yielded, so the chunk size bounds the size of each batch, but not the peak memory use.
+    """
+    yield from result.get_as_arrow(chunk_size=chunk_size).to_batches()
+
+
+def to_polars(result: kuzu.QueryResult, chunk_size: int = DEFAULT_CHUNK_SIZE) -> pl.DataFrame:
+    """Convert a query result into a Polars DataFrame that shares the Arrow buffers."""
+    return pl.from_arrow(result.get_as_arrow(chunk_size=chunk_size), rechunk=False)
+
+
+def iter_rows(result: kuzu.QueryResult) -> Iterator[list]:
+    """Yield the rows of a query result one at a time, as the tutorial's `main()` does."""
+    while result.has_next():
+        yield result.get_next()
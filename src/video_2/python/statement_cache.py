@@ -0,0 +1,57 @@
+"""
+A connection wrapper that caches prepared statements, keyed by their query text.
+
+`conn.execute(query, parameters)` parses, binds and plans the query on every call. Parameterized
+queries that are run repeatedly only need to be prepared once, after which each call just binds
+the new parameter values to the cached prepared statement.
+"""
+
+from collections import OrderedDict
+from typing import Any
+
+import kuzu
+
+
+class CachedConnection:
+    def __init__(self, conn: kuzu.Connection, max_size: int = 128) -> None:
+        self.conn = conn
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._statements: OrderedDict[str, kuzu.PreparedStatement] = OrderedDict()
+
+    def prepare(self, query: str) -> kuzu.PreparedStatement:
+        """Return the prepared statement for `query`, preparing and caching it on a miss."""
+        statement = self._statements.get(query)
+        if statement is not None:
+            self.hits += 1
+            self._statements.move_to_end(query)
+            return statement
+
+        self.misses += 1
+        statement = self.conn.prepare(query)
+        if not statement.is_success():
+            # Don't cache statements that failed to compile, so that the error is raised every time
+            raise RuntimeError(statement.get_error_message())
+        self._statements[query] = statement
+        if len(self._statements) > self.max_size:
+            self._statements.popitem(last=False)
+            self.evictions += 1
+        return statement
+
+    def execute(self, query: str, parameters: dict[str, Any] | None = None) -> kuzu.QueryResult:
+        return self.conn.execute(self.prepare(query), parameters or {})
+
+    def clear(self) -> None:
+        """Drop all cached statements, e.g., after a schema change invalidates their plans."""
+        self._statements.clear()
+
+    def cache_info(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._statements),
+            "max_size": self.max_size,
+        }
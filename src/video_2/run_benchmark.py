@@ -0,0 +1,111 @@
+"""
+Compare the query latency of the Python and Rust APIs on a scaled-up version of the dataset.
+
+Both runners build their own database from the same generated CSV files, run each query a number
+of warmup times, and then time a number of runs. This script aggregates their samples into p50,
+p95 and p99 latencies, with the cost of executing the query reported separately from the cost of
+materializing its results in each language.
+
+Example:
+    python run_benchmark.py --persons 1000000 --runs 100
+"""
+
+import argparse
+import csv
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from generate_data import generate_data
+
+ROOT_DIR = Path(__file__).parent.resolve()
+DATA_DIR = ROOT_DIR / "data" / "scaled"
+QUERIES = [ROOT_DIR / "q1.cypher", ROOT_DIR / "q2.cypher"]
+METRICS = ["execute_ms", "materialize_ms", "total_ms"]
+
+
+def run_python(runs: int, warmup: int) -> list[dict]:
+    output = ROOT_DIR / "python" / "benchmark_python.json"
+    cmd = [sys.executable, "benchmark.py", "--data", str(DATA_DIR), "--output", str(output)]
+    cmd += ["--runs", str(runs), "--warmup", str(warmup), "--queries", *map(str, QUERIES)]
+    subprocess.run(cmd, cwd=ROOT_DIR / "python", check=True)
+    return json.loads(output.read_text())
+
+
+def run_rust(runs: int, warmup: int) -> list[dict]:
+    output = ROOT_DIR / "rust" / "benchmark_rust.json"
+    cmd = ["cargo", "run", "--release", "--bin", "benchmark", "--"]
+    cmd += [str(DATA_DIR), str(runs), str(warmup), str(output), *map(str, QUERIES)]
+    subprocess.run(cmd, cwd=ROOT_DIR / "rust", check=True)
+    return json.loads(output.read_text())
+
+
+def percentile(values: list[float], p: int) -> float:
+    # quantiles() needs at least two samples, and every percentile of a single sample is itself
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[p - 1]
+
+
+def summarize(samples: list[dict]) -> list[dict]:
+    groups: dict[tuple[str, str], list[dict]] = {}
+    for sample in samples:
+        groups.setdefault((sample["binding"], sample["query"]), []).append(sample)
+
+    summary = []
+    for (binding, query), group in sorted(groups.items(), key=lambda item: item[0][::-1]):
+        row = {"query": query, "binding": binding, "runs": len(group)}
+        row["num_rows"] = group[0]["num_rows"]
+        for metric in METRICS:
+            values = [sample[metric] for sample in group]
+            for p in (50, 95, 99):
+                row[f"{metric.removesuffix('_ms')}_p{p}_ms"] = round(percentile(values, p), 3)
+        summary.append(row)
+    return summary
+
+
+def print_summary(summary: list[dict]) -> None:
+    print(f"\n{'query':<6} {'binding':<8} {'metric':<12}", end="")
+    print("".join(f"{f'p{p} (ms)':>12}" for p in (50, 95, 99)))
+    for row in summary:
+        for metric in METRICS:
+            name = metric.removesuffix("_ms")
+            print(f"{row['query']:<6} {row['binding']:<8} {name:<12}", end="")
+            print("".join(f"{row[f'{name}_p{p}_ms']:>12}" for p in (50, 95, 99)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--persons", type=int, default=1_000_000)
+    parser.add_argument("--cities", type=int, default=10_000)
+    parser.add_argument("--follows-per-person", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument(
+        "--bindings", nargs="+", choices=["python", "rust"], default=["python", "rust"]
+    )
+    parser.add_argument("--output", default="benchmark_results")
+    args = parser.parse_args()
+
+    generate_data(DATA_DIR, args.persons, args.cities, args.follows_per_person)
+
+    samples = []
+    if "python" in args.bindings:
+        samples += run_python(args.runs, args.warmup)
+    if "rust" in args.bindings:
+        samples += run_rust(args.runs, args.warmup)
+
+    summary = summarize(samples)
+    print_summary(summary)
+    with open(ROOT_DIR / f"{args.output}.json", "w") as f:
+        json.dump(summary, f, indent=2)
+    with open(ROOT_DIR / f"{args.output}.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=summary[0].keys())
+        writer.writeheader()
+        writer.writerows(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+// Measure the latency of the video_2 queries through the Rust API.
+//
+// Each query is run a number of warmup times, followed by a number of timed runs. For every timed
+// run, the time spent in `conn.query` (compiling and executing the query) is recorded separately
+// from the time spent materializing the result rows as Rust values.
+//
+// Usage: cargo run --release --bin benchmark -- <data_dir> <runs> <warmup> <output> <query>...
+// This binary is usually invoked by `../run_benchmark.py`, which also runs the Python equivalent.
+use kuzu::{Connection, Database, Error, SystemConfig};
+use std::env;
+use std::fs;
+use std::path::Path;
+use std::time::Instant;
+
+fn create_database(db_path: &str) -> Result<Database, Error> {
+    match fs::metadata(db_path) {
+        Ok(m) if m.is_dir() => fs::remove_dir_all(db_path).expect("Could not remove directory"),
+        Ok(_) => fs::remove_file(db_path).expect("Could not remove file"),
+        Err(_) => {}
+    }
+    Database::new(db_path, SystemConfig::default())
+}
+
+// The connection borrows the database, so it's opened by the caller rather than in
+// `create_database`, which couldn't return the database while it's still borrowed.
+fn load_data(conn: &Connection, data_dir: &str) -> Result<(), Error> {
+    conn.query("CREATE NODE TABLE Person(name STRING, age INT64, PRIMARY KEY (name))")?;
+    conn.query("CREATE NODE TABLE City(name STRING, population INT64, PRIMARY KEY (name))")?;
+    conn.query("CREATE REL TABLE Follows(FROM Person TO Person)")?;
+    conn.query("CREATE REL TABLE LivesIn(FROM Person TO City)")?;
+
+    conn.query(&format!("COPY Person FROM '{data_dir}/person.csv'"))?;
+    conn.query(&format!("COPY City FROM '{data_dir}/city.csv'"))?;
+    conn.query(&format!("COPY Follows FROM '{data_dir}/follows.csv'"))?;
+    conn.query(&format!("COPY LivesIn FROM '{data_dir}/lives_in.csv'"))?;
+    Ok(())
+}
+
+struct Sample {
+    execute_ms: f64,
+    materialize_ms: f64,
+    total_ms: f64,
+    num_rows: usize,
+}
+
+fn time_query(conn: &Connection, query: &str) -> Result<Sample, Error> {
+    let start = Instant::now();
+    let result = conn.query(query)?;
+    let executed = Instant::now();
+    let num_rows = result.count();
+    let materialized = Instant::now();
+    Ok(Sample {
+        execute_ms: (executed - start).as_secs_f64() * 1000.0,
+        materialize_ms: (materialized - executed).as_secs_f64() * 1000.0,
+        total_ms: (materialized - start).as_secs_f64() * 1000.0,
+        num_rows,
+    })
+}
+
+fn main() -> Result<(), Error> {
+    let args: Vec<String> = env::args().collect();
+    if args.len() < 6 {
+        eprintln!("Usage: {} <data_dir> <runs> <warmup> <output> <query>...", args[0]);
+        std::process::exit(1);
+    }
+    let data_dir = &args[1];
+    let runs: usize = args[2].parse().expect("runs must be an integer");
+    let warmup: usize = args[3].parse().expect("warmup must be an integer");
+    let output = &args[4];
+
+    let db = create_database("bench_db")?;
+    let conn = Connection::new(&db)?;
+    load_data(&conn, data_dir)?;
+
+    // Serialize the samples by hand, so that the crate doesn't need a JSON dependency
+    let mut samples = Vec::new();
+    for query_path in &args[5..] {
+        let query = fs::read_to_string(query_path).expect("Could not read query file");
+        let name = Path::new(query_path).file_stem().unwrap().to_string_lossy();
+        for _ in 0..warmup {
+            time_query(&conn, &query)?;
+        }
+        for run in 0..runs {
+            let s = time_query(&conn, &query)?;
+            samples.push(format!(
+                "{{\"binding\": \"rust\", \"query\": \"{}\", \"run\": {}, \"execute_ms\": {}, \
+                 \"materialize_ms\": {}, \"total_ms\": {}, \"num_rows\": {}}}",
+                name, run, s.execute_ms, s.materialize_ms, s.total_ms, s.num_rows
+            ));
+        }
+    }
+    fs::write(output, format!("[{}]", samples.join(", "))).expect("Could not write output");
+    println!("Wrote {} Rust samples to {}", samples.len(), output);
+
+    Ok(())
+}
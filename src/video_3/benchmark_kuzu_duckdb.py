@@ -0,0 +1,210 @@
+"""
+Benchmark Kùzu against DuckDB on the person/account/transfer dataset at configurable scale factors.
+
+For each scale factor, the data is generated with `generate_data.py`, and each CSV file is parsed
+once into the rows of the six node and relationship tables of `insert_data_kuzu_single_pass.py`.
+Both databases then load the same six tables from these rows, so that their load times and on-disk
+sizes are for the same data. The same workloads are then run in both engines:
+- k-hop money flow: the number of distinct accounts reachable from an account via up to k
+  transfers, for a sample of start accounts
+- aggregation: the total amount transferred out by each owner, for the top 10 owners
+
+The load time, the p50/p95 query latencies and the on-disk database sizes are written to a JSON
+and CSV report.
+
+Example:
+    python benchmark_kuzu_duckdb.py --scale-factors 1 10 --max-hops 1 2 3
+"""
+
+import argparse
+import csv
+import json
+import shutil
+import statistics
+import time
+from pathlib import Path
+
+import duckdb
+import kuzu
+import numpy as np
+import polars as pl
+
+from generate_data import generate_data
+from insert_data_kuzu_single_pass import build_projections, copy_table, create_schema, read_sources
+
+SEED = 37
+BENCH_DIR = Path("bench")
+NODE_AND_REL_TABLES = ["Person", "Address", "Account", "Owns", "LivesIn", "Transfer"]
+
+KUZU_K_HOP = """
+    MATCH (a:Account {{id: $id}})-[:Transfer*1..{k}]->(b:Account)
+    RETURN count(DISTINCT b.id)
+"""
+DUCKDB_K_HOP = """
+    WITH RECURSIVE reachable(account, depth) AS (
+        SELECT target, 1 FROM Transfer WHERE source = $id
+        UNION
+        SELECT t.target, r.depth + 1
+        FROM reachable r
+        JOIN Transfer t ON t.source = r.account
+        WHERE r.depth < {k}
+    )
+    SELECT count(DISTINCT account) FROM reachable
+"""
+KUZU_TOTAL_PER_OWNER = """
+    MATCH (p:Person)-[:Owns]->(:Account)-[t:Transfer]->(:Account)
+    RETURN p.id AS owner, sum(t.amount) AS total
+    ORDER BY total DESC, owner LIMIT 10
+"""
+DUCKDB_TOTAL_PER_OWNER = """
+    SELECT o.owner AS owner, sum(t.amount) AS total
+    FROM Transfer t
+    JOIN Owns o ON t.source = o.id
+    GROUP BY o.owner
+    ORDER BY total DESC, owner LIMIT 10
+"""
+
+
+def get_disk_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def load_kuzu(db_path: Path, projections: dict[str, pl.DataFrame]) -> kuzu.Connection:
+    shutil.rmtree(db_path, ignore_errors=True)
+    db_path.unlink(missing_ok=True)
+    db_path.with_name(f"{db_path.name}.wal").unlink(missing_ok=True)
+    db = kuzu.Database(str(db_path))
+    conn = kuzu.Connection(db)
+    create_schema(conn)
+    for table in NODE_AND_REL_TABLES:
+        copy_table(conn, table, projections[table])
+    conn.execute("CHECKPOINT")
+    return conn
+
+
+def load_duckdb(
+    db_path: Path, projections: dict[str, pl.DataFrame]
+) -> duckdb.DuckDBPyConnection:
+    db_path.unlink(missing_ok=True)
+    conn = duckdb.connect(database=str(db_path))
+    # The relationship tables become tables of (FROM key, TO key, properties) rows, e.g. Owns has
+    # the owner's person ID and the account's ID
+    for table in NODE_AND_REL_TABLES:
+        conn.register("projection", projections[table])
+        conn.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM projection")
+        conn.unregister("projection")
+    conn.execute("CHECKPOINT")
+    return conn
+
+
+def time_queries(run_query, queries: list[tuple[str, dict]]) -> tuple[list[float], list]:
+    """Run each (query, parameters) pair once, returning the latencies in ms and the results."""
+    latencies, results = [], []
+    for query, parameters in queries:
+        start = time.perf_counter()
+        results.append(run_query(query, parameters))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, results
+
+
+def summarize(latencies: list[float]) -> dict:
+    if len(latencies) == 1:
+        return {"p50_ms": round(latencies[0], 3), "p95_ms": round(latencies[0], 3)}
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {"p50_ms": round(quantiles[49], 3), "p95_ms": round(quantiles[94], 3)}
+
+
+def benchmark_scale_factor(
+    scale_factor: float, max_hops: list[int], num_start_accounts: int, runs: int
+) -> list[dict]:
+    data_dir = BENCH_DIR / f"sf{scale_factor:g}"
+    generate_data(data_dir, scale_factor)
+
+    kuzu_path = BENCH_DIR / f"sf{scale_factor:g}_kuzu"
+    duckdb_path = BENCH_DIR / f"sf{scale_factor:g}.duckdb"
+    # The CSV files are parsed once, outside of the timed loads, so that both engines load the same
+    # tables from the same rows
+    projections = build_projections(read_sources(str(data_dir)))
+    start = time.perf_counter()
+    kuzu_conn = load_kuzu(kuzu_path, projections)
+    kuzu_load = time.perf_counter() - start
+    start = time.perf_counter()
+    duckdb_conn = load_duckdb(duckdb_path, projections)
+    duckdb_load = time.perf_counter() - start
+
+    def run_kuzu(query: str, parameters: dict) -> list:
+        return kuzu_conn.execute(query, parameters=parameters).get_as_df().values.tolist()
+
+    def run_duckdb(query: str, parameters: dict) -> list:
+        return [list(row) for row in duckdb_conn.execute(query, parameters).fetchall()]
+
+    num_accounts = kuzu_conn.execute("MATCH (a:Account) RETURN count(a)").get_next()[0]
+    rng = np.random.default_rng(SEED)
+    start_ids = [int(i) for i in rng.integers(1, num_accounts + 1, num_start_accounts)]
+
+    workloads = {
+        f"{k}_hop_money_flow": (
+            [(KUZU_K_HOP.format(k=k), {"id": i}) for i in start_ids],
+            [(DUCKDB_K_HOP.format(k=k), {"id": i}) for i in start_ids],
+        )
+        for k in max_hops
+    }
+    workloads["total_amount_per_owner"] = (
+        [(KUZU_TOTAL_PER_OWNER, {})] * runs,
+        [(DUCKDB_TOTAL_PER_OWNER, {})] * runs,
+    )
+
+    rows = []
+    for workload, (kuzu_queries, duckdb_queries) in workloads.items():
+        kuzu_latencies, kuzu_results = time_queries(run_kuzu, kuzu_queries)
+        duckdb_latencies, duckdb_results = time_queries(run_duckdb, duckdb_queries)
+        if kuzu_results != duckdb_results:
+            print(f"Warning: Kùzu and DuckDB returned different results for {workload}")
+        for engine, latencies, load_time, db_path in [
+            ("kuzu", kuzu_latencies, kuzu_load, kuzu_path),
+            ("duckdb", duckdb_latencies, duckdb_load, duckdb_path),
+        ]:
+            rows.append(
+                {
+                    "scale_factor": scale_factor,
+                    "engine": engine,
+                    "workload": workload,
+                    "load_s": round(load_time, 3),
+                    **summarize(latencies),
+                    "db_size_mb": round(get_disk_size(db_path) / (1024 * 1024), 2),
+                }
+            )
+            print(rows[-1])
+    duckdb_conn.close()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--scale-factors", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--max-hops", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--start-accounts", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", default="benchmark_results")
+    args = parser.parse_args()
+
+    BENCH_DIR.mkdir(exist_ok=True)
+    results = []
+    for scale_factor in args.scale_factors:
+        results += benchmark_scale_factor(
+            scale_factor, args.max_hops, args.start_accounts, args.runs
+        )
+
+    with open(f"{args.output}.json", "w") as f:
+        json.dump(results, f, indent=2)
+    with open(f"{args.output}.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=results[0].keys())
+        writer.writeheader()
+        writer.writerows(results)
+    print(f"Wrote report to {args.output}.json and {args.output}.csv")
+
+
+if __name__ == "__main__":
+    main()
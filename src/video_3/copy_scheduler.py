@@ -0,0 +1,170 @@
+"""
+A scheduler that runs a DAG of load steps, such as reading source files and copying tables.
+
+Each step declares the steps it depends on (e.g., a rel table depends on the node tables at its
+endpoints, and a node table depends on the step that reads its source file). Steps whose
+dependencies are complete run concurrently in a thread pool, each on its own connection.
+
+Kùzu allows only one write transaction at a time, so steps marked with `writes=True` (i.e., the
+COPY statements) take turns on a write lock. Each COPY is itself parallelized across the
+database's threads, and the scheduler overlaps the other steps, such as parsing the source files,
+with them. The wall time of every step and the critical path through the DAG are recorded.
+
+Example:
+    scheduler = CopyScheduler(db)
+    scheduler.add_step("read_person", lambda conn: ...)
+    scheduler.add_step("Person", lambda conn: ..., depends_on=["read_person"], writes=True)
+    report = scheduler.run()
+    report.print()
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable
+
+import kuzu
+
+
+@dataclass
+class LoadStep:
+    name: str
+    run: Callable[[kuzu.Connection], None]
+    depends_on: list[str] = field(default_factory=list)
+    writes: bool = False
+
+
+@dataclass
+class StepTiming:
+    name: str
+    start: float
+    end: float
+    # Time spent waiting for the write lock, which is included in [start, end]
+    lock_wait: float = 0.0
+
+    @property
+    def seconds(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class ScheduleReport:
+    wall_seconds: float
+    timings: dict[str, StepTiming]
+    critical_path: list[str]
+    critical_path_seconds: float
+
+    def print(self) -> None:
+        print(f"{'step':<20} {'start (s)':>10} {'duration (s)':>13} {'lock wait (s)':>14}")
+        for timing in sorted(self.timings.values(), key=lambda t: t.start):
+            print(
+                f"{timing.name:<20} {timing.start:>10.3f} {timing.seconds:>13.3f} "
+                f"{timing.lock_wait:>14.3f}"
+            )
+        print(f"Total wall time: {self.wall_seconds:.3f}s")
+        print(
+            f"Critical path ({self.critical_path_seconds:.3f}s): {' -> '.join(self.critical_path)}"
+        )
+
+
+class CopyScheduler:
+    def __init__(self, db: kuzu.Database, max_workers: int | None = None) -> None:
+        self.db = db
+        self.max_workers = max_workers
+        self.steps: dict[str, LoadStep] = {}
+        self._write_lock = threading.Lock()
+
+    def add_step(
+        self,
+        name: str,
+        run: Callable[[kuzu.Connection], None],
+        depends_on: list[str] | None = None,
+        writes: bool = False,
+    ) -> None:
+        if name in self.steps:
+            raise ValueError(f"Duplicate step: {name}")
+        self.steps[name] = LoadStep(name, run, list(depends_on or []), writes)
+
+    def run(self) -> ScheduleReport:
+        self._validate()
+        timings: dict[str, StepTiming] = {}
+        done: set[str] = set()
+        running: dict[Future, str] = {}
+        origin = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while len(done) < len(self.steps):
+                for step in self.steps.values():
+                    is_ready = all(dep in done for dep in step.depends_on)
+                    if is_ready and step.name not in done and step.name not in running.values():
+                        running[pool.submit(self._run_step, step, origin)] = step.name
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        timings[name] = future.result()
+                    except Exception:
+                        # Let the steps already running finish, but don't start any new ones
+                        for pending in running:
+                            pending.cancel()
+                        raise
+                    done.add(name)
+
+        critical_path, critical_path_seconds = self._critical_path(timings)
+        return ScheduleReport(
+            wall_seconds=time.perf_counter() - origin,
+            timings=timings,
+            critical_path=critical_path,
+            critical_path_seconds=critical_path_seconds,
+        )
+
+    def _run_step(self, step: LoadStep, origin: float) -> StepTiming:
+        start = time.perf_counter()
+        conn = kuzu.Connection(self.db)
+        lock_wait = 0.0
+        if step.writes:
+            with self._write_lock:
+                lock_wait = time.perf_counter() - start
+                step.run(conn)
+        else:
+            step.run(conn)
+        return StepTiming(step.name, start - origin, time.perf_counter() - origin, lock_wait)
+
+    def _validate(self) -> None:
+        for step in self.steps.values():
+            for dep in step.depends_on:
+                if dep not in self.steps:
+                    raise ValueError(f"Step {step.name} depends on unknown step {dep}")
+        # Detect cycles with a depth-first search
+        visiting, visited = set(), set()
+
+        def visit(name: str) -> None:
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle involving step {name}")
+            visiting.add(name)
+            for dep in self.steps[name].depends_on:
+                visit(dep)
+            visiting.remove(name)
+            visited.add(name)
+
+        for name in self.steps:
+            visit(name)
+
+    def _critical_path(self, timings: dict[str, StepTiming]) -> tuple[list[str], float]:
+        """Return the chain of dependent steps with the largest total duration."""
+        # Durations exclude the time spent waiting for the write lock, which isn't a dependency
+        longest: dict[str, tuple[float, list[str]]] = {}
+
+        def visit(name: str) -> tuple[float, list[str]]:
+            if name not in longest:
+                duration = timings[name].seconds - timings[name].lock_wait
+                deps = [visit(dep) for dep in self.steps[name].depends_on]
+                length, path = max(deps, default=(0.0, []))
+                longest[name] = (length + duration, path + [name])
+            return longest[name]
+
+        length, path = max(visit(name) for name in self.steps)
+        return path, length
@@ -0,0 +1,88 @@
+"""
+Generate a scaled-up version of the person/account/transfer dataset for benchmarking.
+
+The files have the same columns as the ones in `data/`. Each person owns exactly one account, and
+the persons share a smaller pool of addresses. Scale factor 1 corresponds to 10,000 persons and
+100,000 transfers.
+
+Example:
+    python generate_data.py --scale-factor 10
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+SEED = 37
+PERSONS_PER_SF = 10_000
+TRANSFERS_PER_ACCOUNT = 10
+STATES = ["AL", "CA", "FL", "MT", "NY", "OR", "TX", "WA"]
+
+
+def generate_data(output: str | Path, scale_factor: float) -> None:
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(SEED)
+    num_persons = int(PERSONS_PER_SF * scale_factor)
+    num_addresses = max(num_persons * 3 // 4, 1)
+    num_transfers = num_persons * TRANSFERS_PER_ACCOUNT
+    ids = np.arange(1, num_persons + 1)
+
+    address_ids = rng.integers(0, num_addresses, num_persons)
+    zipcodes = rng.integers(10000, 99999, num_addresses)[address_ids]
+    persons = pl.DataFrame(
+        {
+            "id": ids,
+            "name": [f"Person {i}" for i in ids],
+            "address_id": address_ids,
+            "state": pl.Series(STATES).gather(rng.integers(0, len(STATES), num_persons)),
+            "zipcode": zipcodes,
+        }
+    ).select(
+        "id",
+        "name",
+        pl.format("{} Main St, Springfield, {} {}", "address_id", "state", "zipcode").alias(
+            "address"
+        ),
+        "state",
+        "zipcode",
+        pl.format("person{}@example.com", "id").alias("email"),
+    )
+    accounts = pl.DataFrame(
+        {
+            "id": ids,
+            "account_id": [f"{i:09d}" for i in rng.integers(0, 10**9, num_persons)],
+            "owner": ids,
+            "balance": rng.integers(100, 100_000, num_persons),
+        }
+    )
+    transfers = pl.DataFrame(
+        {
+            "source": rng.integers(1, num_persons + 1, num_transfers),
+            "target": rng.integers(1, num_persons + 1, num_transfers),
+            "amount": rng.integers(10, 10_000, num_transfers),
+            "transaction_id": rng.permutation(num_transfers) + 10_000_000,
+        }
+    ).filter(pl.col("source") != pl.col("target"))
+
+    persons.write_csv(output / "person.csv")
+    accounts.write_csv(output / "account.csv")
+    transfers.write_csv(output / "transfer.csv")
+    print(
+        f"Wrote {persons.height} persons, {accounts.height} accounts and "
+        f"{transfers.height} transfers to {output}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--scale-factor", type=float, default=1)
+    parser.add_argument("--output", default=None, help="Defaults to data/sf<scale_factor>")
+    args = parser.parse_args()
+    generate_data(args.output or f"data/sf{args.scale_factor:g}", args.scale_factor)
+
+
+if __name__ == "__main__":
+    main()
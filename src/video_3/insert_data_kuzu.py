@@ -1,7 +1,11 @@
 import kuzu
 import shutil
+from pathlib import Path
 
+# Newer versions of Kùzu store the database in a single file rather than a directory
 shutil.rmtree("./ex_db_kuzu", ignore_errors=True)
+Path("./ex_db_kuzu").unlink(missing_ok=True)
+Path("./ex_db_kuzu.wal").unlink(missing_ok=True)
 db = kuzu.Database("./ex_db_kuzu")
 conn = kuzu.Connection(db)
 
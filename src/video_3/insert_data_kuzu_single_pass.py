@@ -0,0 +1,160 @@
+"""
+This script builds the same Kùzu graph as `insert_data_kuzu.py`, but reads each CSV file only once.
+
+`insert_data_kuzu.py` scans `person.csv` three times (for Person, Address and LivesIn) and
+`account.csv` twice (for Account and Owns). Here, each source file is parsed once into an
+in-memory DataFrame, and every node and relationship table is then copied from a projection of it,
+including the type casts and the distinct set of addresses. The source files are read, the
+projections built, and the tables copied by a scheduler that runs every step as soon as the steps
+it depends on are done, so that reading and projecting overlap with the COPYs of other tables.
+"""
+
+import shutil
+from pathlib import Path
+
+import kuzu
+import polars as pl
+
+from copy_scheduler import CopyScheduler
+
+DB_PATH = "./ex_db_kuzu"
+DATA_DIR = "data"
+
+NODE_TABLES = ["Person", "Address", "Account"]
+REL_TABLES = ["Owns", "LivesIn", "Transfer"]
+
+SOURCE_SCHEMAS = {
+    "person": {"id": pl.Int64, "zipcode": pl.Int64},
+    "account": {"id": pl.Int64, "account_id": pl.String, "owner": pl.Int64, "balance": pl.Float64},
+    "transfer": {
+        "source": pl.Int64,
+        "target": pl.Int64,
+        "amount": pl.Float64,
+        "transaction_id": pl.String,
+    },
+}
+# The source file each table is projected from, and the tables each rel table depends on
+TABLE_SOURCES = {
+    "Person": "person",
+    "Address": "person",
+    "Account": "account",
+    "Owns": "account",
+    "LivesIn": "person",
+    "Transfer": "transfer",
+}
+TABLE_DEPENDENCIES = {
+    "Owns": ["Person", "Account"],
+    "LivesIn": ["Person", "Address"],
+    "Transfer": ["Account"],
+}
+
+
+def create_schema(conn: kuzu.Connection) -> None:
+    conn.execute(
+        """
+        CREATE NODE TABLE Person (
+            id INT64,
+            name STRING,
+            state STRING,
+            zip INT64,
+            email STRING,
+            PRIMARY KEY (id)
+        )
+        """
+    )
+    conn.execute("CREATE NODE TABLE Address (address STRING, PRIMARY KEY (address))")
+    conn.execute(
+        """
+        CREATE NODE TABLE Account (
+            id INT64,
+            account_id STRING,
+            balance DOUBLE,
+            PRIMARY KEY (id)
+        )
+        """
+    )
+    conn.execute("CREATE REL TABLE Owns (FROM Person TO Account)")
+    conn.execute("CREATE REL TABLE LivesIn (FROM Person TO Address)")
+    conn.execute(
+        "CREATE REL TABLE Transfer (FROM Account TO Account, amount DOUBLE, transaction_id STRING)"
+    )
+
+
+def read_sources(data_dir: str) -> dict[str, pl.DataFrame]:
+    """Parse each source CSV file exactly once, casting the columns to their target types."""
+    return {source: read_source(data_dir, source) for source in SOURCE_SCHEMAS}
+
+
+def read_source(data_dir: str, source: str) -> pl.DataFrame:
+    return pl.read_csv(f"{data_dir}/{source}.csv", schema_overrides=SOURCE_SCHEMAS[source])
+
+
+def build_projection(table: str, source: pl.DataFrame) -> pl.DataFrame:
+    """Derive the rows of a node or relationship table from its in-memory source table."""
+    match table:
+        # Nodes
+        case "Person":
+            return source.select("id", "name", "state", pl.col("zipcode").alias("zip"), "email")
+        case "Address":
+            return source.select("address").unique(maintain_order=True)
+        case "Account":
+            return source.select("id", "account_id", "balance")
+        # Rels: the first two columns are the primary keys of the FROM and TO nodes
+        case "Owns":
+            return source.select("owner", "id")
+        case "LivesIn":
+            return source.select("id", "address")
+        case "Transfer":
+            return source.select("source", "target", "amount", "transaction_id")
+    raise ValueError(f"Unknown table: {table}")
+
+
+def build_projections(sources: dict[str, pl.DataFrame]) -> dict[str, pl.DataFrame]:
+    return {
+        table: build_projection(table, sources[source]) for table, source in TABLE_SOURCES.items()
+    }
+
+
+def copy_table(conn: kuzu.Connection, table: str, df: pl.DataFrame) -> None:
+    conn.execute(f"COPY {table} FROM df")
+
+
+def main() -> None:
+    # Newer versions of Kùzu store the database in a single file rather than a directory
+    shutil.rmtree(DB_PATH, ignore_errors=True)
+    Path(DB_PATH).unlink(missing_ok=True)
+    Path(f"{DB_PATH}.wal").unlink(missing_ok=True)
+    db = kuzu.Database(DB_PATH)
+    create_schema(kuzu.Connection(db))
+
+    # Each source file is read, and each table projected from it, concurrently with the COPYs that
+    # don't depend on it. Only the COPYs themselves take the write lock.
+    sources: dict[str, pl.DataFrame] = {}
+    projections: dict[str, pl.DataFrame] = {}
+    scheduler = CopyScheduler(db)
+    for source in SOURCE_SCHEMAS:
+        scheduler.add_step(
+            f"read_{source}",
+            lambda conn, source=source: sources.update({source: read_source(DATA_DIR, source)}),
+        )
+    for table in NODE_TABLES + REL_TABLES:
+        source = TABLE_SOURCES[table]
+        scheduler.add_step(
+            f"project_{table}",
+            lambda conn, table=table, source=source: projections.update(
+                {table: build_projection(table, sources[source])}
+            ),
+            depends_on=[f"read_{source}"],
+        )
+        scheduler.add_step(
+            table,
+            # The projection is no longer needed once it's been copied
+            lambda conn, table=table: copy_table(conn, table, projections.pop(table)),
+            depends_on=[f"project_{table}", *TABLE_DEPENDENCIES.get(table, [])],
+            writes=True,
+        )
+    scheduler.run().print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Record the wall time, row count and peak memory of every statement the ETL scripts run.
+
+Within an `instrument(stage)` block, every `kuzu.Connection.execute` call and every asyncpg
+`execute`, `executemany`, `fetch` and `copy_records_to_table` call is timed. Each call is
+appended as a JSON line to a metrics file, with the hash of the statement text, its wall time,
+the number of rows it returned or affected (where the database reports it), and the peak RSS of
+the process so far. When the block exits, a summary of the stage is printed, with the statements
+that took the most time first.
+
+Every script appends to the same file, whose path is set by the `ETL_METRICS_PATH` environment
+variable (`etl_metrics.jsonl` next to this module by default), so that the summary of a whole
+pipeline run shows which stage dominates:
+
+    python etl_metrics.py etl_metrics.jsonl
+
+Example:
+    with instrument("merge_copurchaser_edges"):
+        main()
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import re
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import asyncpg
+import kuzu
+
+# Defaults to a file next to this module, so that scripts run from any directory share it
+METRICS_PATH = os.environ.get("ETL_METRICS_PATH", Path(__file__).parent / "etl_metrics.jsonl")
+ASYNCPG_METHODS = ["execute", "executemany", "fetch", "copy_records_to_table"]
+
+
+def get_peak_rss_mb() -> float:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def normalize(statement: str) -> str:
+    return " ".join(statement.split())
+
+
+def hash_statement(statement: str) -> str:
+    return hashlib.sha1(normalize(statement).encode()).hexdigest()[:12]
+
+
+class MetricsLog:
+    def __init__(self, stage: str, path: str | Path = METRICS_PATH) -> None:
+        self.stage = stage
+        self.path = Path(path)
+        self.records: list[dict[str, Any]] = []
+        # Statements can run on several threads at once, e.g., one per worker connection
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a")
+
+    def record(
+        self, engine: str, statement: str, seconds: float, rows: int | None, error: str | None
+    ) -> None:
+        record = {
+            "timestamp": round(time.time(), 3),
+            "stage": self.stage,
+            "engine": engine,
+            "statement_hash": hash_statement(statement),
+            "statement": normalize(statement)[:200],
+            "wall_ms": round(seconds * 1000, 3),
+            "rows": rows,
+            "peak_rss_mb": round(get_peak_rss_mb(), 1),
+            "error": error,
+        }
+        with self._lock:
+            self.records.append(record)
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def get_kuzu_rows(result: kuzu.QueryResult | list[kuzu.QueryResult]) -> int:
+    """Return the number of rows a query returned, or the number of rows copied for a COPY."""
+    if isinstance(result, list):
+        return sum(get_kuzu_rows(r) for r in result)
+    if result.get_column_names() == ["result"] and result.get_num_tuples() == 1:
+        # Statements such as COPY return a single message, rather than the rows they wrote
+        message = result.get_next()[0]
+        result.reset_iterator()
+        if match := re.match(r"(\d+) tuples have been copied", str(message)):
+            return int(match.group(1))
+    return result.get_num_tuples()
+
+
+def get_asyncpg_rows(method: str, args: tuple, result: Any) -> int | None:
+    if method == "fetch":
+        return len(result)
+    if method == "executemany":
+        return len(args[1]) if len(args) > 1 and hasattr(args[1], "__len__") else None
+    # The status of execute and copy_records_to_table ends with the row count, e.g., "INSERT 0 5"
+    if isinstance(result, str) and (match := re.search(r"(\d+)$", result)):
+        return int(match.group(1))
+    return None
+
+
+def get_asyncpg_statement(method: str, args: tuple, kwargs: dict) -> str:
+    if method == "copy_records_to_table":
+        columns = kwargs.get("columns")
+        column_list = f" ({', '.join(columns)})" if columns else ""
+        return f"COPY {args[0]}{column_list} FROM STDIN"
+    return args[0]
+
+
+def wrap_kuzu_execute(log: MetricsLog, execute: Callable) -> Callable:
+    @functools.wraps(execute)
+    def wrapper(self, query, parameters=None):
+        statement = query if isinstance(query, str) else "<prepared statement>"
+        start = time.perf_counter()
+        try:
+            result = execute(self, query, parameters)
+        except Exception as e:
+            log.record("kuzu", statement, time.perf_counter() - start, None, str(e))
+            raise
+        log.record("kuzu", statement, time.perf_counter() - start, get_kuzu_rows(result), None)
+        return result
+
+    return wrapper
+
+
+def wrap_asyncpg_method(log: MetricsLog, method: str, call: Callable) -> Callable:
+    @functools.wraps(call)
+    async def wrapper(self, *args, **kwargs):
+        statement = get_asyncpg_statement(method, args, kwargs)
+        start = time.perf_counter()
+        try:
+            result = await call(self, *args, **kwargs)
+        except Exception as e:
+            log.record("postgres", statement, time.perf_counter() - start, None, str(e))
+            raise
+        rows = get_asyncpg_rows(method, args, result)
+        log.record("postgres", statement, time.perf_counter() - start, rows, None)
+        return result
+
+    return wrapper
+
+
+@contextmanager
+def instrument(stage: str, path: str | Path = METRICS_PATH) -> Iterator[MetricsLog]:
+    """Time every Kùzu and asyncpg statement run in the block, and print a summary at the end."""
+    log = MetricsLog(stage, path)
+    patched: list[tuple[type, str, Callable]] = [
+        (kuzu.Connection, "execute", kuzu.Connection.execute)
+    ]
+    kuzu.Connection.execute = wrap_kuzu_execute(log, kuzu.Connection.execute)
+    # Pooled connections look these methods up on the connection class, so they're covered too
+    for method in ASYNCPG_METHODS:
+        call = getattr(asyncpg.Connection, method)
+        patched.append((asyncpg.Connection, method, call))
+        setattr(asyncpg.Connection, method, wrap_asyncpg_method(log, method, call))
+    start = time.perf_counter()
+    try:
+        yield log
+    finally:
+        for cls, name, original in patched:
+            setattr(cls, name, original)
+        log.close()
+        print_summary(log.records, wall_seconds=time.perf_counter() - start)
+        print(f"Wrote {len(log.records)} statement metrics to {log.path}")
+
+
+def summarize(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Aggregate the records by stage and statement, with the most time-consuming first."""
+    groups: dict[tuple[str, str], dict[str, Any]] = {}
+    for record in records:
+        key = (record["stage"], record["statement_hash"])
+        group = groups.setdefault(
+            key,
+            {
+                "stage": record["stage"],
+                "statement_hash": record["statement_hash"],
+                "statement": record["statement"],
+                "calls": 0,
+                "errors": 0,
+                "total_ms": 0.0,
+                "rows": 0,
+                "peak_rss_mb": 0.0,
+            },
+        )
+        group["calls"] += 1
+        group["errors"] += record["error"] is not None
+        group["total_ms"] += record["wall_ms"]
+        group["rows"] += record["rows"] or 0
+        group["peak_rss_mb"] = max(group["peak_rss_mb"], record["peak_rss_mb"])
+    return sorted(groups.values(), key=lambda group: group["total_ms"], reverse=True)
+
+
+def print_summary(records: list[dict[str, Any]], wall_seconds: float | None = None) -> None:
+    stage_ms: dict[str, float] = defaultdict(float)
+    for record in records:
+        stage_ms[record["stage"]] += record["wall_ms"]
+    for stage, total_ms in sorted(stage_ms.items(), key=lambda item: item[1], reverse=True):
+        print(f"Stage {stage}: {total_ms / 1000:.3f}s in statements")
+    if wall_seconds is not None:
+        print(f"Wall time: {wall_seconds:.3f}s")
+
+    print(
+        f"{'stage':<34} {'hash':<12} {'calls':>6} {'errors':>6} {'total (ms)':>11} "
+        f"{'rows':>10} {'RSS (MB)':>9}  statement"
+    )
+    for group in summarize(records):
+        print(
+            f"{group['stage']:<34} {group['statement_hash']:<12} {group['calls']:>6} "
+            f"{group['errors']:>6} {group['total_ms']:>11.1f} {group['rows']:>10} "
+            f"{group['peak_rss_mb']:>9.1f}  {group['statement'][:60]}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarize the metrics of a pipeline run")
+    parser.add_argument("path", nargs="?", default=METRICS_PATH)
+    args = parser.parse_args()
+    with open(args.path) as f:
+        print_summary([json.loads(line) for line in f])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,274 @@
 """
 This script adds copurchaser edges to the graph, based on whether two people have purchased the same product.
+
+Rather than running a MERGE for every pair of customers per shared product, the distinct
+(customer, product) purchases are fetched as a DataFrame, and the copurchaser pairs are computed
+with a columnar self-join on the product. Each pair appears once, with a `weight` equal to the
+number of products the two customers have both purchased, and the pairs are bulk-copied into the
+COPURCHASED table.
+
+Given a batch of new purchases (`--new-purchases`), the edges are instead maintained incrementally:
+only the current buyers of the products in the batch are fetched, the change in weight of every
+pair the batch affects is computed, and the purchases and the weight changes are applied to the
+graph in a single transaction.
 """
+import argparse
+
 import kuzu
+import polars as pl
+
+from etl_metrics import instrument
+
+
+def get_purchases(conn: kuzu.Connection) -> pl.DataFrame:
+    return conn.execute(
+        """
+        MATCH (c:Customer)-[:PURCHASED]->(p:Product)
+        RETURN DISTINCT c.name AS customer, p.name AS product
+        """
+    ).get_as_pl()
+
+
+def get_buyers(conn: kuzu.Connection, products: list[str]) -> pl.DataFrame:
+    """Return the distinct (customer, product) purchases of the given products."""
+    return conn.execute(
+        """
+        MATCH (c:Customer)-[:PURCHASED]->(p:Product)
+        WHERE p.name IN $products
+        RETURN DISTINCT c.name AS customer, p.name AS product
+        """,
+        parameters={"products": products},
+    ).get_as_pl()
+
+
+def compute_copurchasers(purchases: pl.DataFrame, max_buyers: int | None = None) -> pl.DataFrame:
+    """
+    Return the distinct copurchaser pairs, along with the number of products they share.
 
-# Open existing Kùzu database
-db = kuzu.Database("./ex_db_kuzu")
-conn = kuzu.Connection(db)
+    Args:
+        purchases: The distinct (customer, product) purchases.
+        max_buyers: If set, skip products bought by more than this many customers. A product
+            bought by n customers produces n * (n - 1) / 2 pairs, so a few very popular products can
+            dominate the output while saying little about how similar two customers are.
+    """
+    if max_buyers is not None:
+        purchases = purchases.filter(pl.len().over("product") <= max_buyers)
+    return (
+        purchases.join(purchases, on="product", suffix="_2")
+        # Keep each unordered pair once, and skip a customer paired with themselves
+        .filter(pl.col("customer") < pl.col("customer_2"))
+        .group_by("customer", "customer_2")
+        .agg(pl.len().cast(pl.Int64).alias("weight"))
+        .rename({"customer": "from", "customer_2": "to"})
+    )
 
-# Create relationship table for copurchasers
-conn.execute("CREATE REL TABLE IF NOT EXISTS COPURCHASED(FROM Customer TO Customer);")
 
-# Add copurchaser edges to the graph
-conn.execute(
+def compute_copurchaser_deltas(
+    buyers: pl.DataFrame, new_purchases: pl.DataFrame, max_buyers: int | None = None
+) -> pl.DataFrame:
     """
-    MATCH (c1:Customer)-[:PURCHASED]->(:Product)<-[:PURCHASED]-(c2:Customer)
-    WHERE id(c1) < id(c2)
-    MERGE (c1)-[:COPURCHASED]->(c2);
+    Return the change in weight of each copurchaser pair caused by a batch of new purchases.
+
+    The result has the same `from` < `to` orientation as `compute_copurchasers`, so applying the
+    deltas to its output gives the same edges as recomputing them over all the purchases.
+
+    Args:
+        buyers: The distinct (customer, product) purchases of the products in the batch, before the
+            batch is applied.
+        new_purchases: The (customer, product) purchases in the batch. Repeat purchases of a
+            product don't change any weights.
+        max_buyers: Same as in `compute_copurchasers`. A product that exceeds this number of buyers
+            because of the batch has its existing pairs removed.
     """
-)
-print("Merged copurchaser edges into the graph!")
+    new = new_purchases.select("customer", "product").unique().join(
+        buyers, on=["customer", "product"], how="anti"
+    )
+    current = pl.concat(
+        [buyers.with_columns(is_new=pl.lit(False)), new.with_columns(is_new=pl.lit(True))]
+    ).with_columns(
+        num_before=(~pl.col("is_new")).sum().over("product"),
+        num_after=pl.len().over("product"),
+    )
+
+    if max_buyers is None:
+        eligible = current
+    else:
+        eligible = current.filter(pl.col("num_after") <= max_buyers)
+    # Each new buyer of a product pairs with every other buyer of it. A pair of two new buyers is
+    # produced from both sides of the join, so only one side is kept.
+    added = (
+        eligible.filter("is_new")
+        .join(eligible, on="product", suffix="_2")
+        .filter(
+            (pl.col("customer") != pl.col("customer_2"))
+            & (~pl.col("is_new_2") | (pl.col("customer") < pl.col("customer_2")))
+        )
+        .select("customer", "customer_2", delta=pl.lit(1, dtype=pl.Int64))
+    )
+    deltas = [added]
+    if max_buyers is not None:
+        # Products that only now exceed the limit no longer contribute their existing pairs
+        dropped = current.filter(
+            ~pl.col("is_new")
+            & (pl.col("num_before") <= max_buyers)
+            & (pl.col("num_after") > max_buyers)
+        ).select("customer", "product")
+        removed = (
+            dropped.join(dropped, on="product", suffix="_2")
+            .filter(pl.col("customer") < pl.col("customer_2"))
+            .select("customer", "customer_2", delta=pl.lit(-1, dtype=pl.Int64))
+        )
+        deltas.append(removed)
+
+    first, second = pl.col("customer"), pl.col("customer_2")
+    return (
+        pl.concat(deltas)
+        .select(
+            pl.when(first < second).then(first).otherwise(second).alias("from"),
+            pl.when(first < second).then(second).otherwise(first).alias("to"),
+            "delta",
+        )
+        .group_by("from", "to")
+        .agg(pl.col("delta").sum())
+        .filter(pl.col("delta") != 0)
+    )
+
+
+def get_existing_names(conn: kuzu.Connection, table: str, names: list[str]) -> list[str]:
+    """Return which of the given names are the primary keys of nodes in the table."""
+    return conn.execute(
+        f"MATCH (n:{table}) WHERE n.name IN $names RETURN n.name AS name",
+        parameters={"names": names},
+    ).get_as_pl()["name"].to_list()
+
+
+def drop_unknown_purchases(conn: kuzu.Connection, new_purchases: pl.DataFrame) -> pl.DataFrame:
+    """
+    Return the purchases whose customer and product are both in the graph.
+
+    `add_purchases` can only match purchases to existing nodes, so the others would otherwise be
+    left out of PURCHASED while still being counted in the copurchaser weights.
+    """
+    customers = get_existing_names(conn, "Customer", new_purchases["customer"].unique().to_list())
+    products = get_existing_names(conn, "Product", new_purchases["product"].unique().to_list())
+    return new_purchases.filter(
+        pl.col("customer").is_in(customers) & pl.col("product").is_in(products)
+    )
+
+
+def add_purchases(conn: kuzu.Connection, new_purchases: pl.DataFrame) -> None:
+    """
+    Add a PURCHASED edge for each purchase, like `copy_from_sources.py` does for each row of the
+    `purchased` table. A repeat purchase of a product is added as another edge alongside the earlier
+    ones, rather than replacing their quantity. The edges have no `purchase_id`, since they don't
+    come from Postgres.
+    """
+    conn.execute(
+        """
+        LOAD FROM new_purchases
+        MATCH (c:Customer {name: customer}), (p:Product {name: product})
+        CREATE (c)-[:PURCHASED {quantity: quantity}]->(p)
+        """
+    )
+
+
+def update_copurchasers(conn: kuzu.Connection, copurchaser_deltas: pl.DataFrame) -> None:
+    """Apply the weight changes to the COPURCHASED edges, removing those with no shared products."""
+    conn.execute(
+        """
+        LOAD FROM copurchaser_deltas
+        MATCH (a:Customer {name: `from`}), (b:Customer {name: `to`})
+        MERGE (a)-[r:COPURCHASED]->(b)
+        ON CREATE SET r.weight = delta
+        ON MATCH SET r.weight = r.weight + delta
+        """
+    )
+    # Only pairs whose weight went down can have dropped to zero
+    conn.execute(
+        """
+        LOAD FROM copurchaser_deltas
+        WHERE delta < 0
+        MATCH (a:Customer {name: `from`})-[r:COPURCHASED]->(b:Customer {name: `to`})
+        WHERE r.weight <= 0
+        DELETE r
+        """
+    )
+
+
+def merge_new_purchases(
+    conn: kuzu.Connection, new_purchases: pl.DataFrame, max_buyers: int | None
+) -> None:
+    """
+    Add a batch of (customer, product, quantity) purchases, and update COPURCHASED to match.
+
+    Purchases whose customer or product isn't in the graph are skipped.
+    """
+    conn.execute(
+        "CREATE REL TABLE IF NOT EXISTS COPURCHASED(FROM Customer TO Customer, weight INT64);"
+    )
+    num_purchases = new_purchases.height
+    new_purchases = drop_unknown_purchases(conn, new_purchases)
+    num_skipped = num_purchases - new_purchases.height
+    if num_skipped > 0:
+        print(f"Skipped {num_skipped} purchases whose customer or product is not in the graph")
+    # The existing buyers must be read before the batch is added, to tell which purchases are new
+    buyers = get_buyers(conn, new_purchases["product"].unique().to_list())
+    copurchaser_deltas = compute_copurchaser_deltas(buyers, new_purchases, max_buyers)
+
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        add_purchases(conn, new_purchases)
+        if copurchaser_deltas.height > 0:
+            update_copurchasers(conn, copurchaser_deltas)
+        conn.execute("COMMIT")
+    except RuntimeError:
+        conn.execute("ROLLBACK")
+        raise
+    print(
+        f"Added {new_purchases.height} purchases and updated the weights of "
+        f"{copurchaser_deltas.height} copurchaser pairs"
+    )
+
+
+def main(max_buyers: int | None, new_purchases_path: str | None) -> None:
+    # Open existing Kùzu database
+    db = kuzu.Database("./ex_db_kuzu")
+    conn = kuzu.Connection(db)
+
+    if new_purchases_path is not None:
+        new_purchases = pl.read_csv(
+            new_purchases_path,
+            columns=["customer", "product", "quantity"],
+            schema_overrides={"quantity": pl.Int32},
+        )
+        merge_new_purchases(conn, new_purchases, max_buyers)
+        return
+
+    copurchasers_df = compute_copurchasers(get_purchases(conn), max_buyers)
+    print(f"Computed {copurchasers_df.height} copurchaser pairs")
+
+    # The edges are always rebuilt from scratch, so recreate the relationship table
+    conn.execute("DROP TABLE IF EXISTS COPURCHASED;")
+    conn.execute("CREATE REL TABLE COPURCHASED(FROM Customer TO Customer, weight INT64);")
+
+    # Add copurchaser edges to the graph
+    conn.execute("COPY COPURCHASED FROM copurchasers_df;")
+    print("Merged copurchaser edges into the graph!")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add copurchaser edges to the graph")
+    parser.add_argument(
+        "--max-buyers",
+        type=int,
+        default=None,
+        help="Skip products bought by more than this many customers",
+    )
+    parser.add_argument(
+        "--new-purchases",
+        default=None,
+        help="CSV file of new (customer, product, quantity) purchases to add incrementally",
+    )
+    args = parser.parse_args()
+    with instrument("merge_copurchaser_edges"):
+        main(args.max_buyers, args.new_purchases)
@@ -1,34 +1,64 @@
 """
 This script adds historical sales numbers for each product to the Product table in the Kùzu database.
+
+The sales log is scanned lazily with Polars, and aggregated by its streaming engine in parallel
+batches, so the log is never held in memory as a whole. The aggregate has a single row per
+product, which is applied to the Product table in a single LOAD FROM statement.
 """
 import kuzu
-import pandas as pd
-
-# Read the CSV file of historical sales
-df = pd.read_csv("./data/historical_sales.csv")
-print(f"Historical sales:\n{df.head(15)}")
+import polars as pl
 
-# Group by product and sum the quantities
-historical_sales_df = (
-    df.groupby("product")["quantity"].sum().sort_values(ascending=False).reset_index()
-)
+from etl_metrics import instrument
 
-# Rename the column for clarity
-historical_sales_df = historical_sales_df.rename(columns={"quantity": "historical_sales"})
-print(f"Aggregated historical sales:\n{historical_sales_df.head(15)}")
+HISTORICAL_SALES_PATH = "./data/historical_sales.csv"
+# The range of Product.historical_sales, which is an INT32 column (see copy_from_sources.py)
+INT32_MIN, INT32_MAX = -(2**31), 2**31 - 1
 
-# Open existing Kùzu database
-db = kuzu.Database("./ex_db_kuzu")
-conn = kuzu.Connection(db)
 
-# Load from historical_sales_df will return (product, historical_sales) tuples.
-# For each tuple, we'll match the product node p, such that p.name = product
-# and then set the historical_sales value to the historical_sales property of the node.
-conn.execute(
+def aggregate_historical_sales(path: str) -> pl.DataFrame:
     """
-    LOAD FROM historical_sales_df
-    MATCH (p:Product {name: product})
-    SET p.historical_sales = historical_sales;
+    Return the total quantity sold of each product, across all years.
+
+    Raises a ValueError naming the products whose total doesn't fit in the INT32
+    `historical_sales` column, rather than failing on the cast or storing a wrapped value.
     """
-)
-print("Merged historical sales numbers for each product into Product table")
+    totals = (
+        pl.scan_csv(path, schema={"product": pl.String, "year": pl.Int32, "quantity": pl.Int64})
+        .group_by("product")
+        .agg(pl.col("quantity").sum().alias("historical_sales"))
+        .sort("historical_sales", descending=True)
+        .collect(engine="streaming")
+    )
+    out_of_range = totals.filter(~pl.col("historical_sales").is_between(INT32_MIN, INT32_MAX))
+    if out_of_range.height > 0:
+        raise ValueError(
+            f"Total sales don't fit in the INT32 Product.historical_sales column for "
+            f"{out_of_range.height} product(s), e.g. {out_of_range.head(5).rows()}"
+        )
+    return totals.with_columns(pl.col("historical_sales").cast(pl.Int32))
+
+
+def main() -> None:
+    historical_sales_df = aggregate_historical_sales(HISTORICAL_SALES_PATH)
+    print(f"Aggregated historical sales:\n{historical_sales_df.head(15)}")
+
+    # Open existing Kùzu database
+    db = kuzu.Database("./ex_db_kuzu")
+    conn = kuzu.Connection(db)
+
+    # Load from historical_sales_df will return (product, historical_sales) tuples.
+    # Each tuple is matched to the product node p with p.name = product through the primary key
+    # index, and the historical_sales property of all the matched nodes is set in one statement.
+    conn.execute(
+        """
+        LOAD FROM historical_sales_df
+        MATCH (p:Product {name: product})
+        SET p.historical_sales = historical_sales;
+        """
+    )
+    print("Merged historical sales numbers for each product into Product table")
+
+
+if __name__ == "__main__":
+    with instrument("merge_historical_sales_properties"):
+        main()
@@ -4,58 +4,189 @@ This script adds recommendation edges to the graph
 A product will be recommended to a customer based on two conditions:
 (1) The customer copurchased a product with another customer
 (2) The product is "popular", that is, it has a high historical sales quantity of > 6000
+
+Each candidate product is scored by the copurchaser overlap, which is the total weight of the
+COPURCHASED edges between the customer and the other customers who purchased the product, times
+the product's popularity, which is its historical sales relative to the best-selling popular
+product. The scoring and the selection of the top-k products of each customer are vectorized in
+Polars.
+
+The customers are split into hash partitions (shards), and the candidates of each shard are
+fetched by a pool of worker threads, each with its own connection. As each shard completes, its
+recommendations are bulk-copied into the IS_RECOMMENDED table along with their scores, and
+appended to a Parquet file, so only the shards in flight are held in memory at a time.
 """
+import argparse
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Iterator
+
 import kuzu
+import polars as pl
+import pyarrow.parquet as pq
 
-# Connect to the Kùzu database
-db = kuzu.Database("./ex_db_kuzu")
-conn = kuzu.Connection(db)
+from etl_metrics import instrument
 
-# Get recommendations for each customer
-response = conn.execute(
-    """
-    MATCH (c:Customer)-[:Copurchased]-(c2:Customer)-[:PURCHASED]->(p:Product)
-    WHERE NOT EXISTS {MATCH (c)-[:PURCHASED]->(p)}
-          AND p.historical_sales > 6000
-    RETURN DISTINCT c.name AS customer, p.name AS product
-    """
-)
-recommendations_df = response.get_as_df()
-recommendations_df = recommendations_df.sort_values("customer").reset_index(drop=True)
-print(f"Recommendations for each customer:\n{recommendations_df.head()}")
+# The candidates of the customers in a shard, with their copurchaser overlap and popularity. Several
+# paths to the same copurchaser and product (e.g. from repeated purchases) are counted once.
+CANDIDATES_QUERY = """
+    MATCH (c:Customer)-[w:COPURCHASED]-(c2:Customer)-[:PURCHASED]->(p:Product)
+    WHERE hash(c.name) % $num_shards = $shard
+          AND NOT EXISTS {MATCH (c)-[:PURCHASED]->(p)}
+          AND p.historical_sales > $min_sales
+    WITH DISTINCT c, c2, p, w.weight AS weight
+    RETURN c.name AS customer,
+           p.name AS product,
+           CAST(sum(weight), 'INT64') AS overlap,
+           p.historical_sales AS historical_sales
+"""
 
-# Add a new table `IS_RECOMMENDED` to store the recommendations
-conn.execute(
-    """
-    CREATE REL TABLE IF NOT EXISTS IS_RECOMMENDED (
-        FROM Customer TO Product
+
+def get_max_sales(conn: kuzu.Connection, min_sales: int) -> int | None:
+    response = conn.execute(
+        "MATCH (p:Product) WHERE p.historical_sales > $min_sales RETURN max(p.historical_sales)",
+        parameters={"min_sales": min_sales},
     )
+    return response.get_next()[0]
+
+
+def get_candidates(
+    conn: kuzu.Connection, min_sales: int, shard: int = 0, num_shards: int = 1
+) -> pl.DataFrame:
+    return conn.execute(
+        CANDIDATES_QUERY,
+        parameters={"min_sales": min_sales, "shard": shard, "num_shards": num_shards},
+    ).get_as_pl()
+
+
+def score_recommendations(candidates: pl.DataFrame, top_k: int, max_sales: int) -> pl.DataFrame:
+    """Return the `top_k` highest-scoring candidates of each customer, from best to worst."""
+    popularity = pl.col("historical_sales") / max_sales
+    return (
+        candidates.with_columns(score=pl.col("overlap") * popularity)
+        # Break ties by product name, so the same recommendations are produced on every run
+        .sort(["customer", "score", "product"], descending=[False, True, False])
+        .filter(pl.int_range(pl.len()).over("customer") < top_k)
+        .select("customer", "product", "score")
+    )
+
+
+def group_recommendations(recommendations: pl.DataFrame) -> pl.DataFrame:
+    """Return the recommendations of each customer as lists of products and scores, best first."""
+    return recommendations.group_by("customer", maintain_order=True).agg(
+        pl.col("product").alias("recommendations"),
+        pl.col("score").alias("scores"),
+    )
+
+
+def iter_shard_candidates(
+    db: kuzu.Database, min_sales: int, num_shards: int, num_workers: int
+) -> Iterator[pl.DataFrame]:
     """
-)
-
-# Load from recommendations_df will return (customer, product) tuples.
-# For each tuple, we'll match the customer node c and the product node p
-# and then merge the IS_RECOMMENDED relationship between them
-conn.execute("""
-    LOAD FROM recommendations_df
-    MATCH (c:Customer {name: customer}), (p:Product {name: product})
-    MERGE (c)-[:IS_RECOMMENDED]->(p)
-""")
-print("Merged IS_RECOMMENDED edges into the graph!")
-
-# We can obtain recommendations for each customer by running the following query
-response = conn.execute(
-    """
-    MATCH (c:Customer)-[:IS_RECOMMENDED]->(p:Product)
-    RETURN c.name AS customer, collect(p.name) AS recommendations
+    Yield the candidates of each shard, in the order the shards complete.
+
+    At most `num_workers` shards are fetched at a time, so that completed shards don't pile up in
+    memory when the consumer is slower than the workers.
     """
-)
-recommendations_df = response.get_as_df()
-print(f"Recommendations for each customer:\n{recommendations_df.head()}")
+    # There's no use for more workers than shards, and the idle ones would take CPUs from the others
+    num_workers = min(num_workers, num_shards)
+    # Split the CPUs between the workers, since each query is also parallelized by Kùzu
+    threads_per_worker = max(1, (os.cpu_count() or 1) // num_workers)
+    idle_conns = [kuzu.Connection(db, num_threads=threads_per_worker) for _ in range(num_workers)]
+    running: dict[Future, kuzu.Connection] = {}
+    shards = iter(range(num_shards))
+    with ThreadPoolExecutor(max_workers=num_workers) as pool:
+        while True:
+            # Hand every idle connection a shard, until there are no shards left
+            for worker_conn, shard in zip(list(idle_conns), shards):
+                idle_conns.remove(worker_conn)
+                future = pool.submit(get_candidates, worker_conn, min_sales, shard, num_shards)
+                running[future] = worker_conn
+            if not running:
+                return
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                idle_conns.append(running.pop(future))
+                yield future.result()
+
 
-# Write the recommendations to a Parquet file
-recommendations_df.to_parquet("data/recommendations.parquet")
+def merge_recommendations(
+    db: kuzu.Database,
+    top_k: int,
+    min_sales: int,
+    output: str,
+    num_shards: int,
+    num_workers: int,
+) -> int:
+    """Rebuild IS_RECOMMENDED and write the Parquet file shard by shard, returning the edge count."""
+    conn = kuzu.Connection(db)
+    max_sales = get_max_sales(conn, min_sales)
 
+    # Rebuild the recommendations in a single write transaction, so that other connections keep
+    # seeing the previous ones until it commits. This also defers the checkpoint to the commit,
+    # since Kùzu can't checkpoint after each COPY while the workers' read transactions are open.
+    conn.execute("BEGIN TRANSACTION")
+    num_edges = 0
+    writer = None
+    try:
+        conn.execute("DROP TABLE IF EXISTS IS_RECOMMENDED;")
+        conn.execute("CREATE REL TABLE IS_RECOMMENDED(FROM Customer TO Product, score DOUBLE);")
+        for candidates in iter_shard_candidates(db, min_sales, num_shards, num_workers):
+            # Customers are partitioned by shard, so the top-k of each shard is final
+            recommendations_df = score_recommendations(candidates, top_k, max_sales)
+            if recommendations_df.height == 0:
+                continue
+            conn.execute("COPY IS_RECOMMENDED FROM recommendations_df;")
+            table = group_recommendations(recommendations_df).to_arrow()
+            if writer is None:
+                writer = pq.ParquetWriter(output, table.schema)
+            writer.write_table(table)
+            num_edges += recommendations_df.height
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
 
+    if writer is None:
+        # Still write an empty file, so that it doesn't keep the results of a previous run
+        group_recommendations(
+            pl.DataFrame(schema={"customer": pl.String, "product": pl.String, "score": pl.Float64})
+        ).write_parquet(output)
+    return num_edges
 
 
+def main(top_k: int, min_sales: int, output: str, num_shards: int, num_workers: int) -> None:
+    # Connect to the Kùzu database
+    db = kuzu.Database("./ex_db_kuzu")
+    num_edges = merge_recommendations(db, top_k, min_sales, output, num_shards, num_workers)
+    print(f"Merged {num_edges} IS_RECOMMENDED edges into the graph!")
+    print(f"Wrote the recommendations to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add recommendation edges to the graph")
+    parser.add_argument(
+        "--top-k", type=int, default=3, help="Number of products to recommend to each customer"
+    )
+    parser.add_argument(
+        "--min-sales",
+        type=int,
+        default=6000,
+        help="Only recommend products with more historical sales than this",
+    )
+    parser.add_argument("--output", default="data/recommendations.parquet")
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Number of hash partitions of the customers, each computed separately",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Number of shards computed in parallel"
+    )
+    args = parser.parse_args()
+    with instrument("merge_recommendation_edges"):
+        main(args.top_k, args.min_sales, args.output, args.shards, args.workers)
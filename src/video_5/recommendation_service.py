@@ -0,0 +1,188 @@
+"""
+An in-process lookup API for the recommendations in the IS_RECOMMENDED table, with a result cache.
+
+Running a Cypher query on every lookup costs far more than the lookup itself. Instead, each
+customer's recommendations are cached after the first lookup, in an LRU cache whose entries also
+expire after a time-to-live (TTL), so that the cache stays bounded and stale entries eventually
+refresh.
+
+`merge_recommendation_edges.py` rebuilds IS_RECOMMENDED by dropping and recreating it, which gives
+the table a new ID in the catalog. At most once per `check_interval_seconds`, a lookup checks the
+table's ID, and the whole cache is invalidated if it has changed.
+
+Kùzu locks a database file for the process that opens it, and a process that opens it read-only
+keeps any other process from opening it for writing. The service is therefore meant to share a
+read-write `Database` with the rebuilds, which run in the same process by calling
+`merge_recommendations` on that `Database`.
+
+Example:
+    db = kuzu.Database("./ex_db_kuzu")
+    service = RecommendationService(kuzu.Connection(db))
+    service.recommend("Alex", k=3)
+    merge_recommendations(db, 3, 6000, "data/recommendations.parquet", num_shards=1, num_workers=1)
+    # Once the service's next check sees the new table, the cache is invalidated
+    service.recommend("Alex", k=3)
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+from collections import OrderedDict
+
+import kuzu
+
+from merge_recommendation_edges import merge_recommendations
+
+Recommendation = tuple[str, float]
+
+
+class RecommendationService:
+    def __init__(
+        self,
+        conn: kuzu.Connection,
+        max_size: int = 10_000,
+        ttl_seconds: float = 300.0,
+        check_interval_seconds: float = 1.0,
+    ) -> None:
+        self.conn = conn
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # Each entry holds its expiry time and all of the customer's recommendations, best first
+        self._entries: OrderedDict[str, tuple[float, list[Recommendation]]] = OrderedDict()
+        # A connection can't run queries from several threads at once, so lookups take turns
+        self._lock = threading.RLock()
+        self._table_id = self._get_table_id()
+        self._next_check = time.monotonic() + check_interval_seconds
+
+    def recommend(self, customer: str, k: int = 3) -> list[Recommendation]:
+        """Return the top `k` (product, score) recommendations of `customer`, best first."""
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_check:
+                self._check_for_rebuild(now)
+            entry = self._entries.get(customer)
+            if entry is not None:
+                expires_at, recommendations = entry
+                if now < expires_at:
+                    self.hits += 1
+                    self._entries.move_to_end(customer)
+                    return recommendations[:k]
+                del self._entries[customer]
+                self.expirations += 1
+
+            self.misses += 1
+            # Cache all of the customer's recommendations, so that lookups with any k can use them
+            recommendations = self._get_recommendations(customer)
+            self._entries[customer] = (now + self.ttl_seconds, recommendations)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return recommendations[:k]
+
+    def invalidate(self, customer: str | None = None) -> None:
+        """Drop the cached recommendations of `customer`, or of every customer if it's None."""
+        with self._lock:
+            if customer is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(customer, None)
+            self.invalidations += 1
+
+    def cache_info(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+        }
+
+    def _get_recommendations(self, customer: str) -> list[Recommendation]:
+        response = self.conn.execute(
+            """
+            MATCH (c:Customer {name: $customer})-[r:IS_RECOMMENDED]->(p:Product)
+            RETURN p.name, r.score
+            ORDER BY r.score DESC, p.name
+            """,
+            parameters={"customer": customer},
+        )
+        return [(product, score) for product, score in response.get_all()]
+
+    def _get_table_id(self) -> int | None:
+        response = self.conn.execute("CALL show_tables() WHERE name = 'IS_RECOMMENDED' RETURN id")
+        return response.get_next()[0] if response.has_next() else None
+
+    def _check_for_rebuild(self, now: float) -> None:
+        self._next_check = now + self.check_interval_seconds
+        table_id = self._get_table_id()
+        if table_id != self._table_id:
+            self._table_id = table_id
+            self.invalidate()
+
+
+def percentile(values: list[float], p: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[p - 1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--db", default="./ex_db_kuzu")
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--max-size", type=int, default=10_000)
+    parser.add_argument("--ttl", type=float, default=300.0)
+    parser.add_argument(
+        "--check-interval", type=float, default=1.0, help="Seconds between checks for a rebuild"
+    )
+    parser.add_argument(
+        "--rebuild-after",
+        type=int,
+        default=None,
+        help="Rebuild IS_RECOMMENDED in the same database after this many lookups",
+    )
+    parser.add_argument("--output", default="data/recommendations.parquet")
+    args = parser.parse_args()
+
+    # Open the database for writing, so that IS_RECOMMENDED can be rebuilt while the service runs
+    db = kuzu.Database(args.db)
+    conn = kuzu.Connection(db)
+    service = RecommendationService(
+        conn,
+        max_size=args.max_size,
+        ttl_seconds=args.ttl,
+        check_interval_seconds=args.check_interval,
+    )
+    customers = [row[0] for row in conn.execute("MATCH (c:Customer) RETURN c.name").get_all()]
+
+    # Time random lookups, most of which are served from the cache once it's warm
+    rng = random.Random(37)
+    latencies_us = []
+    for i, customer in enumerate(rng.choices(customers, k=args.lookups)):
+        if i == args.rebuild_after:
+            num_edges = merge_recommendations(
+                db, args.k, min_sales=6000, output=args.output, num_shards=1, num_workers=1
+            )
+            print(f"Rebuilt IS_RECOMMENDED with {num_edges} edges after {i} lookups")
+        start = time.perf_counter()
+        service.recommend(customer, args.k)
+        latencies_us.append((time.perf_counter() - start) * 1e6)
+
+    print(f"Recommendations for {customers[0]}: {service.recommend(customers[0], args.k)}")
+    print(
+        f"{args.lookups} lookups: p50 {percentile(latencies_us, 50):.1f}us, "
+        f"p95 {percentile(latencies_us, 95):.1f}us, p99 {percentile(latencies_us, 99):.1f}us"
+    )
+    print(f"Cache: {service.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+This script incrementally syncs the Customer and PURCHASED tables from Postgres into Kùzu.
+
+`copy_from_sources.py` copies the whole `customer` and `purchased` tables, which only works on a
+fresh database. This script instead keeps a high-water mark of the `updated_at` column of each
+Postgres table in a `SyncState` node table in Kùzu. Each run pulls only the rows that were inserted
+or updated since the previous run, and upserts them into the graph, so that its cost is
+proportional to the number of changed rows rather than the size of the whole history.
+
+`updated_at` is set by Postgres to `now()`, the start time of the writing transaction, so a row can
+become visible after rows with a later `updated_at`, and after a sync has moved the high-water mark
+past it. Each run therefore rescans the rows within a safety window before the high-water mark,
+which must be longer than any transaction that writes to these tables. The upserts are idempotent,
+so rows that were already synced are simply applied again. A purchase's customer and product are
+assumed never to change, and only its quantity to be updated. `insert_data_to_pg.py` creates
+triggers that set `updated_at` on every update, so writers don't need to set it themselves.
+
+Run `copy_from_sources.py` once to create the graph (or again, if it was created before PURCHASED
+had a `purchase_id`), followed by this script on every refresh.
+"""
+
+import kuzu
+
+from etl_metrics import instrument
+
+PG_CONNECTION_STRING = (
+    "dbname=postgres user=postgres host=localhost password=testpassword port=5432"
+)
+# Rows with an `updated_at` value later than this are synced on the first run
+INITIAL_HIGH_WATER_MARK = "1970-01-01 00:00:00"
+# How far before the high-water mark each run rescans, to pick up rows committed late
+SAFETY_WINDOW = "5 minutes"
+
+# Upsert statements for each source table, applied to the rows in (since, new_mark]. A customer can
+# purchase the same product several times, so each PURCHASED edge is matched by its purchase ID.
+UPSERTS = {
+    "customer": """
+        LOAD FROM pg_db.customer
+        WHERE updated_at > timestamp($high_water_mark) - interval($safety_window)
+          AND updated_at <= timestamp($new_mark)
+        MERGE (c:Customer {name: name})
+        SET c.city = city
+    """,
+    "purchased": """
+        LOAD FROM pg_db.purchased
+        WHERE updated_at > timestamp($high_water_mark) - interval($safety_window)
+          AND updated_at <= timestamp($new_mark)
+        MATCH (c:Customer {name: customer}), (p:Product {name: product})
+        MERGE (c)-[r:PURCHASED {purchase_id: id}]->(p)
+        SET r.quantity = quantity
+    """,
+}
+
+
+def attach_postgres(conn: kuzu.Connection) -> None:
+    conn.execute("INSTALL postgres; LOAD EXTENSION postgres;")
+    conn.execute(
+        f"""
+        ATTACH '{PG_CONNECTION_STRING}' AS pg_db (
+            dbtype postgres,
+            skip_unsupported_table=false
+        )
+        """
+    )
+
+
+def get_high_water_mark(conn: kuzu.Connection, source: str) -> str:
+    response = conn.execute(
+        "MATCH (s:SyncState {source: $source}) RETURN CAST(s.high_water_mark, 'STRING')",
+        parameters={"source": source},
+    )
+    return response.get_next()[0] if response.has_next() else INITIAL_HIGH_WATER_MARK
+
+
+def sync_table(conn: kuzu.Connection, source: str) -> None:
+    high_water_mark = get_high_water_mark(conn, source)
+    # Fix the upper bound first, so that rows written during this run are left for the next one
+    response = conn.execute(
+        f"""
+        LOAD FROM pg_db.{source}
+        WHERE updated_at > timestamp($high_water_mark) - interval($safety_window)
+        RETURN CAST(max(updated_at), 'STRING'), count(*)
+        """,
+        parameters={"high_water_mark": high_water_mark, "safety_window": SAFETY_WINDOW},
+    )
+    new_mark, num_changed = response.get_next()
+    if num_changed == 0:
+        print(f"No new or changed rows in {source} since {high_water_mark}")
+        return
+    # Never move the mark backwards, e.g. if the rows at the previous mark have since been deleted
+    new_mark = max(new_mark, high_water_mark)
+
+    # Apply the changes and advance the high-water mark in the same transaction
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        conn.execute(
+            UPSERTS[source],
+            parameters={
+                "high_water_mark": high_water_mark,
+                "new_mark": new_mark,
+                "safety_window": SAFETY_WINDOW,
+            },
+        )
+        conn.execute(
+            """
+            MERGE (s:SyncState {source: $source})
+            SET s.high_water_mark = timestamp($new_mark)
+            """,
+            parameters={"source": source, "new_mark": new_mark},
+        )
+        conn.execute("COMMIT")
+    except RuntimeError:
+        conn.execute("ROLLBACK")
+        raise
+    print(
+        f"Synced {num_changed} new, changed or rescanned rows from {source} (up to {new_mark})"
+    )
+
+
+def main() -> None:
+    # Open the existing Kùzu database created by copy_from_sources.py
+    db = kuzu.Database("./ex_db_kuzu")
+    conn = kuzu.Connection(db)
+    conn.execute(
+        """
+        CREATE NODE TABLE IF NOT EXISTS SyncState(
+            source STRING,
+            high_water_mark TIMESTAMP,
+            PRIMARY KEY (source)
+        )
+        """
+    )
+    attach_postgres(conn)
+
+    # Customers are synced first, so that new purchases can be matched to new customers
+    for source in ["customer", "purchased"]:
+        sync_table(conn, source)
+
+
+if __name__ == "__main__":
+    with instrument("sync_from_postgres"):
+        main()
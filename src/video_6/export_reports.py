@@ -0,0 +1,137 @@
+"""
+Export reports of the health insurance providers of the patients with each condition, from a
+single scan of the graph.
+
+Running a `COPY (MATCH ...) TO` statement per condition re-traverses every HAS_CONDITION edge and
+unwinds every insurance provider once per report. Instead, the traversal is run once, and its rows
+are split by a partition key (the condition's name, by default) in a single hash-partitioning pass.
+Each partition is then written to any number of outputs, each with its own columns. The format of
+each output is chosen from its file extension: `.json`, `.parquet` or `.csv`.
+
+Example:
+    python export_reports.py --format parquet --output-dir data/reports
+"""
+import argparse
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import kuzu
+import polars as pl
+
+# The name, age and health insurance provider of every patient with a condition. Patients with
+# several health insurance providers have one row per provider.
+REPORT_QUERY = """
+    MATCH (p:Patient)-[:HAS_CONDITION]->(c:Condition)
+    {where}
+    WITH p.name AS name, p.info.age AS age, c.name AS condition, p.info.insurance_provider AS ip
+    UNWIND ip AS provider
+    WITH name, age, provider, condition
+    WHERE provider.type = "health"
+    RETURN name, age, condition, provider
+"""
+FORMATS = ["json", "parquet", "csv"]
+
+
+@dataclass
+class Output:
+    """A file to write the rows of a partition to, and the columns to select if not all of them."""
+
+    path: str | Path
+    columns: list[str | pl.Expr] | None = None
+
+
+def get_report_rows(conn: kuzu.Connection, conditions: list[str] | None = None) -> pl.DataFrame:
+    """Run the shared traversal once, for the given conditions or for all of them if None."""
+    if conditions is None:
+        return conn.execute(REPORT_QUERY.format(where="")).get_as_pl()
+    return conn.execute(
+        REPORT_QUERY.format(where="WHERE c.name IN $conditions"),
+        parameters={"conditions": conditions},
+    ).get_as_pl()
+
+
+def flatten_structs(df: pl.DataFrame) -> pl.DataFrame:
+    """Unnest the struct columns, e.g. `provider` into `provider.name`, since CSV can't nest."""
+    for name, dtype in df.schema.items():
+        if isinstance(dtype, pl.Struct):
+            df = df.with_columns(pl.col(name).name.prefix_fields(f"{name}.")).unnest(name)
+    # Unnesting a struct can leave a nested struct in its place, so repeat until there's none left
+    if any(isinstance(dtype, pl.Struct) for dtype in df.schema.values()):
+        return flatten_structs(df)
+    return df
+
+
+def write_output(df: pl.DataFrame, path: str | Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".json":
+        df.write_json(path)
+    elif path.suffix == ".parquet":
+        df.write_parquet(path)
+    elif path.suffix == ".csv":
+        flatten_structs(df).write_csv(path)
+    else:
+        raise ValueError(f"Unsupported output format {path.suffix!r}, expected one of {FORMATS}")
+
+
+def export_partitions(
+    rows: pl.DataFrame, partition_by: str, outputs: dict[Any, list[Output]]
+) -> int:
+    """
+    Write the rows of each partition to its outputs, returning the number of files written.
+
+    Args:
+        rows: The rows of the shared traversal.
+        partition_by: The column whose value decides which outputs a row is written to.
+        outputs: The outputs of each value of the partition column. Rows with any other value are
+            skipped, and the outputs of a value with no rows are written with no rows, so that
+            they don't keep the results of a previous export.
+    """
+    partitions = rows.partition_by(partition_by, as_dict=True)
+    num_files = 0
+    for key, key_outputs in outputs.items():
+        partition = partitions.get((key,), rows.clear())
+        for output in key_outputs:
+            df = partition if output.columns is None else partition.select(output.columns)
+            write_output(df, output.path)
+            num_files += 1
+    return num_files
+
+
+def get_partition_path(output_dir: str | Path, key: Any, file_format: str) -> Path:
+    """Return the file to write a partition to, named after its key, e.g. `Diabetes_Type_1.csv`."""
+    name = re.sub(r"[^\w-]+", "_", str(key)).strip("_")
+    return Path(output_dir) / f"{name}.{file_format}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--db", default="ex_db_kuzu")
+    parser.add_argument("--output-dir", default="data/reports")
+    parser.add_argument("--format", choices=FORMATS, default="json")
+    parser.add_argument(
+        "--conditions",
+        nargs="+",
+        default=None,
+        help="Names of the conditions to export reports for (all of them by default)",
+    )
+    args = parser.parse_args()
+
+    conn = kuzu.Connection(kuzu.Database(args.db, read_only=True))
+    rows = get_report_rows(conn, args.conditions)
+    # Every condition gets a report, even if none of its patients have a health insurance provider
+    conditions = args.conditions or [
+        name for (name,) in conn.execute("MATCH (c:Condition) RETURN c.name").get_all()
+    ]
+    outputs = {
+        condition: [Output(get_partition_path(args.output_dir, condition, args.format))]
+        for condition in conditions
+    }
+    num_files = export_partitions(rows, "condition", outputs)
+    print(f"Wrote {num_files} reports of {rows.height} rows to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,89 +1,98 @@
 import shutil
-import kuzu
-
-shutil.rmtree("ex_db_kuzu", ignore_errors=True)
-db = kuzu.Database("ex_db_kuzu")
-conn = kuzu.Connection(db)
-
-# Install and load the json extension
-conn.execute("""
-    INSTALL json;
-    LOAD EXTENSION json;
-""")
-
-# --- 1. Create node and relationship tables ---
-
-conn.execute("""
-    CREATE NODE TABLE IF NOT EXISTS Patient(
-        p_id STRING,
-        name STRING,
-        info STRUCT(
-            height FLOAT,
-            weight FLOAT,
-            age UINT8,
-            insurance_provider STRUCT(
-                type STRING,
-                name STRING,
-                policy_number STRING
-            )[]
-        ),
-        PRIMARY KEY (p_id)
-    )
-""")
-
-conn.execute("""
-    CREATE NODE TABLE IF NOT EXISTS Condition(
-        c_id STRING,
-        name STRING,
-        description STRING,
-        PRIMARY KEY (c_id)
-    )
-""")
+from pathlib import Path
 
-conn.execute("""
-    CREATE REL TABLE IF NOT EXISTS HAS_CONDITION(
-        FROM Patient TO Condition,
-        since UINT16
+import kuzu
+import polars as pl
+
+from export_reports import Output, export_partitions, get_report_rows
+
+
+def create_schema(conn: kuzu.Connection) -> None:
+    """Create the Patient, Condition and HAS_CONDITION tables, if they don't exist yet."""
+    conn.execute("""
+        CREATE NODE TABLE IF NOT EXISTS Patient(
+            p_id STRING,
+            name STRING,
+            info STRUCT(
+                height FLOAT,
+                weight FLOAT,
+                age UINT8,
+                insurance_provider STRUCT(
+                    type STRING,
+                    name STRING,
+                    policy_number STRING
+                )[]
+            ),
+            PRIMARY KEY (p_id)
+        )
+    """)
+
+    conn.execute("""
+        CREATE NODE TABLE IF NOT EXISTS Condition(
+            c_id STRING,
+            name STRING,
+            description STRING,
+            PRIMARY KEY (c_id)
+        )
+    """)
+
+    conn.execute("""
+        CREATE REL TABLE IF NOT EXISTS HAS_CONDITION(
+            FROM Patient TO Condition,
+            since UINT16
+        )
+    """)
+
+
+def main() -> None:
+    # Newer versions of Kùzu store the database in a single file rather than a directory
+    shutil.rmtree("ex_db_kuzu", ignore_errors=True)
+    Path("ex_db_kuzu").unlink(missing_ok=True)
+    Path("ex_db_kuzu.wal").unlink(missing_ok=True)
+    db = kuzu.Database("ex_db_kuzu")
+    conn = kuzu.Connection(db)
+
+    # Install and load the json extension
+    conn.execute("""
+        INSTALL json;
+        LOAD EXTENSION json;
+    """)
+
+    # --- 1. Create node and relationship tables ---
+
+    create_schema(conn)
+
+    # --- 2. Ingest data into node and relationship tables ---
+
+    conn.execute("COPY Patient FROM 'data/patient.json'")
+    conn.execute("COPY Condition FROM 'data/condition.json'")
+    conn.execute("COPY HAS_CONDITION FROM 'data/has_condition.json'")
+
+    # --- 3. Output query results to JSON files ---
+
+    # Both reports come from a single traversal of the graph, whose rows are split by condition
+    rows = get_report_rows(conn, ["Diabetes (Type 1)", "Migraine"])
+    export_partitions(
+        rows,
+        "condition",
+        {
+            # The name, age, condition, and health insurance provider of patients with diabetes
+            "Diabetes (Type 1)": [
+                Output(
+                    "data/patient_conditions.json",
+                    [
+                        "name",
+                        "age",
+                        "condition",
+                        pl.col("provider").struct.field("name").alias("health_insurance_provider"),
+                    ],
+                )
+            ],
+            # The health insurance provider information and patient names of patients with Migraine
+            "Migraine": [Output("data/patient_providers.json")],
+        },
     )
-""")
-
-# --- 2. Ingest data into node and relationship tables ---
-
-conn.execute("COPY Patient FROM 'data/patient.json'")
-conn.execute("COPY Condition FROM 'data/condition.json'")
-conn.execute("COPY HAS_CONDITION FROM 'data/has_condition.json'")
-
-# --- 3. Output a query result to a JSON file using COPY TO ---
-
-conn.execute("""
-    // Write the name, age, condition, and health insurance provider for patients with diabetes to JSON file
-    COPY (
-        MATCH (p:Patient)-[:HAS_CONDITION]->(c:Condition)
-        WHERE c.name = "Diabetes (Type 1)"
-        WITH p.name AS name, p.info.age AS age, c.name AS condition, p.info.insurance_provider AS ip
-        UNWIND ip AS provider
-        WITH name, age, provider, condition
-        WHERE provider.type = "health"
-        RETURN name, age, condition, provider.name AS health_insurance_provider
-    ) TO 'data/patient_conditions.json';
-""")
-
-conn.execute("""
-    // Write health insurance provider information and patient names for patients with Migraine to JSON file
-    COPY (
-        MATCH (p:Patient)-[:HAS_CONDITION]->(c:Condition)
-        WHERE c.name = "Migraine"
-        WITH p.name AS name, p.info.age AS age, c.name AS condition, p.info.insurance_provider AS ip
-        UNWIND ip AS provider
-        WITH name, age, provider, condition
-        WHERE provider.type = "health"
-        RETURN name, age, condition, provider
-    ) TO 'data/patient_providers.json';
-""")
-
-
-
-
-
 
 
+if __name__ == "__main__":
+    main()
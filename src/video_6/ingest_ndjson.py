@@ -0,0 +1,298 @@
+"""
+Stream newline-delimited JSON (NDJSON) files of patients, conditions and their relationships into
+Kùzu, setting aside the records that can't be loaded rather than aborting the whole load.
+
+`COPY Patient FROM 'data/patient.json'` reads a single JSON document, and one bad record fails the
+whole COPY. Instead, each NDJSON file is read in chunks of whole lines, which a pool of worker
+threads parses with Arrow's JSON reader against the schema of the table. Only a few chunks are in
+flight at a time, so memory stays bounded however large the file is.
+
+A record is rejected if it isn't valid JSON, has a field that isn't in the schema or a value of the
+wrong type (e.g. an `age` that doesn't fit in a UINT8), is missing its primary key or repeats one
+that's already been loaded, or is a relationship to a patient or condition that hasn't been loaded.
+Rejected records are written to a reject file as JSON lines, along with the table, file, line and
+error, and every other record of the chunk is bulk-copied into Kùzu.
+
+Example:
+    python ingest_ndjson.py --rejects rejects.ndjson
+"""
+import argparse
+import json
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import IO, Iterator
+
+import kuzu
+import polars as pl
+import pyarrow as pa
+import pyarrow.json as pj
+
+from ingest_json import create_schema
+
+INSURANCE_PROVIDER = pa.struct(
+    [("type", pa.string()), ("name", pa.string()), ("policy_number", pa.string())]
+)
+# The Arrow equivalent of each table's Kùzu schema, which records are parsed and validated against
+SCHEMAS = {
+    "Patient": pa.schema(
+        [
+            ("p_id", pa.string()),
+            ("name", pa.string()),
+            (
+                "info",
+                pa.struct(
+                    [
+                        ("height", pa.float32()),
+                        ("weight", pa.float32()),
+                        ("age", pa.uint8()),
+                        ("insurance_provider", pa.list_(INSURANCE_PROVIDER)),
+                    ]
+                ),
+            ),
+        ]
+    ),
+    "Condition": pa.schema(
+        [("c_id", pa.string()), ("name", pa.string()), ("description", pa.string())]
+    ),
+    "HAS_CONDITION": pa.schema(
+        [("from", pa.string()), ("to", pa.string()), ("since", pa.uint16())]
+    ),
+}
+PRIMARY_KEYS = {"Patient": "p_id", "Condition": "c_id"}
+# The node tables at either end of each relationship table
+ENDPOINTS = {"HAS_CONDITION": ("Patient", "Condition")}
+
+
+@dataclass
+class Chunk:
+    """A block of whole lines of an NDJSON file, parsed into a table of its valid records."""
+
+    block: bytes
+    first_line: int
+    table: pa.Table | None = None
+    # The (line number, text) of each row of the table, if the block had to be parsed line by line
+    lines: list[tuple[int, bytes]] | None = None
+    rejects: list[tuple[int, str, bytes]] = field(default_factory=list)
+
+    def get_line(self, row: int) -> tuple[int, bytes]:
+        if self.lines is None:
+            self.lines = split_lines(self.block, self.first_line)
+        return self.lines[row]
+
+
+@dataclass
+class IngestStats:
+    table: str
+    read: int = 0
+    loaded: int = 0
+    rejected: int = 0
+
+
+def split_lines(block: bytes, first_line: int) -> list[tuple[int, bytes]]:
+    """Return the (line number, text) of each non-blank line, since the JSON reader skips blanks."""
+    return [(first_line + i, line) for i, line in enumerate(block.split(b"\n")) if line.strip()]
+
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[tuple[bytes, int]]:
+    """Yield blocks of about `chunk_size` bytes that end on a line break, with their first line."""
+    first_line = 1
+    rest = b""
+    with open(path, "rb") as f:
+        while data := f.read(chunk_size):
+            block = rest + data
+            end = block.rfind(b"\n") + 1
+            # A line longer than the chunk size is read into a single, larger block
+            if end == 0:
+                rest = block
+                continue
+            yield block[:end], first_line
+            first_line += block.count(b"\n", 0, end)
+            rest = block[end:]
+    if rest:
+        yield rest, first_line
+
+
+def parse_json(block: bytes, schema: pa.Schema) -> pa.Table:
+    return pj.read_json(
+        pa.BufferReader(block),
+        # The chunks are parsed in parallel by the workers, so each one is parsed as a single block
+        read_options=pj.ReadOptions(use_threads=False, block_size=max(len(block), 1)),
+        parse_options=pj.ParseOptions(explicit_schema=schema, unexpected_field_behavior="error"),
+    )
+
+
+def parse_chunk(block: bytes, first_line: int, schema: pa.Schema) -> Chunk:
+    """Parse a block of NDJSON, isolating the lines that can't be parsed if there are any."""
+    chunk = Chunk(block, first_line)
+    try:
+        chunk.table = parse_json(block, schema)
+        return chunk
+    except pa.ArrowInvalid:
+        pass
+
+    # Bisect the lines, so that a few bad records in a large block take few reparses to find
+    tables: list[pa.Table] = []
+    chunk.lines = []
+    pending = [split_lines(block, first_line)]
+    while pending:
+        lines = pending.pop()
+        try:
+            tables.append(parse_json(b"\n".join(text for _, text in lines), schema))
+            chunk.lines.extend(lines)
+        except pa.ArrowInvalid as e:
+            if len(lines) == 1:
+                line, text = lines[0]
+                chunk.rejects.append((line, str(e), text))
+            else:
+                # The second half is pushed first, so that the lines are kept in order
+                middle = len(lines) // 2
+                pending.extend([lines[middle:], lines[:middle]])
+    chunk.table = pa.concat_tables(tables) if tables else schema.empty_table()
+    return chunk
+
+
+def iter_parsed_chunks(
+    path: str, schema: pa.Schema, chunk_size: int, num_workers: int
+) -> Iterator[Chunk]:
+    """Yield the parsed chunks of an NDJSON file in order, while the workers parse the next few."""
+    window: deque[Future] = deque()
+    with ThreadPoolExecutor(max_workers=num_workers) as pool:
+        for block, first_line in read_chunks(path, chunk_size):
+            window.append(pool.submit(parse_chunk, block, first_line, schema))
+            if len(window) >= 2 * num_workers:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+
+
+def get_keys(conn: kuzu.Connection, table: str) -> set[str]:
+    key = PRIMARY_KEYS[table]
+    return set(conn.execute(f"MATCH (n:{table}) RETURN n.{key}").get_as_pl()[f"n.{key}"])
+
+
+def validate_nodes(df: pl.DataFrame, table: str, keys: set[str]) -> list[str | None]:
+    """Return why each row can't be loaded, or None if it can, adding the new keys to `keys`."""
+    errors: list[str | None] = []
+    for key in df[PRIMARY_KEYS[table]]:
+        if key is None:
+            errors.append(f"missing primary key {PRIMARY_KEYS[table]}")
+        elif key in keys:
+            errors.append(f"duplicate primary key {key!r}")
+        else:
+            keys.add(key)
+            errors.append(None)
+    return errors
+
+
+def validate_rels(
+    df: pl.DataFrame, table: str, node_keys: dict[str, set[str]]
+) -> list[str | None]:
+    """Return why each row can't be loaded, or None if it can."""
+    from_table, to_table = ENDPOINTS[table]
+    from_keys, to_keys = node_keys[from_table], node_keys[to_table]
+    errors: list[str | None] = []
+    for src, dst in zip(df["from"], df["to"]):
+        if src not in from_keys:
+            errors.append(f"unknown {from_table} {src!r}")
+        elif dst not in to_keys:
+            errors.append(f"unknown {to_table} {dst!r}")
+        else:
+            errors.append(None)
+    return errors
+
+
+def write_reject(
+    rejects: IO[str], table: str, path: str, line: int, error: str, text: bytes
+) -> None:
+    record = {
+        "table": table,
+        "file": path,
+        "line": line,
+        "error": error,
+        "record": text.decode(errors="replace"),
+    }
+    rejects.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def ingest_file(
+    conn: kuzu.Connection,
+    table: str,
+    path: str,
+    node_keys: dict[str, set[str]],
+    rejects: IO[str],
+    chunk_size: int,
+    num_workers: int,
+) -> IngestStats:
+    """Load an NDJSON file into `table` chunk by chunk, writing the records it rejects."""
+    stats = IngestStats(table)
+    for chunk in iter_parsed_chunks(path, SCHEMAS[table], chunk_size, num_workers):
+        for line, error, text in chunk.rejects:
+            write_reject(rejects, table, path, line, error, text)
+        stats.read += chunk.table.num_rows + len(chunk.rejects)
+        stats.rejected += len(chunk.rejects)
+
+        df = pl.from_arrow(chunk.table)
+        if table in PRIMARY_KEYS:
+            errors = validate_nodes(df, table, node_keys[table])
+        else:
+            errors = validate_rels(df, table, node_keys)
+        for row, error in enumerate(errors):
+            if error is not None:
+                line, text = chunk.get_line(row)
+                write_reject(rejects, table, path, line, error, text)
+                stats.rejected += 1
+
+        batch = df.filter(pl.Series(errors, dtype=pl.String).is_null())
+        if batch.height > 0:
+            conn.execute(f"COPY {table} FROM batch")
+            stats.loaded += batch.height
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--db", default="ex_db_kuzu")
+    parser.add_argument("--patients", default="data/patient.ndjson")
+    parser.add_argument("--conditions", default="data/condition.ndjson")
+    parser.add_argument("--has-condition", default="data/has_condition.ndjson")
+    parser.add_argument(
+        "--rejects", default="rejects.ndjson", help="File to write the rejected records to"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=16,
+        help="Size of the chunks the files are parsed in, in MiB",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Number of chunks parsed in parallel"
+    )
+    args = parser.parse_args()
+
+    db = kuzu.Database(args.db)
+    conn = kuzu.Connection(db)
+    create_schema(conn)
+    # Seed the keys with the nodes already in the database, so that the files can be appended
+    node_keys = {table: get_keys(conn, table) for table in PRIMARY_KEYS}
+
+    # Nodes are loaded before the relationships between them
+    files = [
+        ("Patient", args.patients),
+        ("Condition", args.conditions),
+        ("HAS_CONDITION", args.has_condition),
+    ]
+    with open(args.rejects, "w") as rejects:
+        for table, path in files:
+            stats = ingest_file(
+                conn, table, path, node_keys, rejects, args.chunk_size * 1024 * 1024, args.workers
+            )
+            print(
+                f"{table}: loaded {stats.loaded} of {stats.read} records from {path}, "
+                f"rejected {stats.rejected}"
+            )
+    print(f"Wrote the rejected records to {args.rejects}")
+
+
+if __name__ == "__main__":
+    main()
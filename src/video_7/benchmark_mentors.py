@@ -0,0 +1,104 @@
+"""
+Benchmark loading the scholars and attaching their mentors, against the previous implementation.
+
+The previous implementation loaded the JSON files into Python objects, then scanned every mentor
+relationship for every scholar, which takes time proportional to the number of scholars times the
+number of relationships. The current one parses the files straight into columns, groups the
+relationships by scholar once and joins them onto the scholars, which takes time proportional to
+their sum. Both are first checked to give the same result on the data in `data/`, then timed on
+synthetic genealogies of increasing size, read from files like those in `data/`. The nested loop
+is only timed up to `--max-legacy` scholars, since it would take hours on the larger ones.
+
+Example:
+    python benchmark_mentors.py --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from build_graph import process_scholar_data
+
+
+def process_scholar_data_nested_loop(path: str) -> list[dict[str, str | list[str]]]:
+    """The previous implementation of `process_scholar_data`."""
+    with open(f"{path}/tree.json", "r") as f:
+        scholar_mentors = json.load(f)
+
+    with open(f"{path}/scholars.json", "r") as f:
+        scholars = json.load(f)
+
+    mentor_relationships = []
+    for scholar_pair in scholar_mentors:
+        for scholar in scholar_pair["scholars"]:
+            for mentor in scholar_pair["mentors"]:
+                mentor_relationships.append({"scholar": scholar, "mentor": mentor})
+
+    for scholar in scholars:
+        mentors = []
+        for mentor_relationship in mentor_relationships:
+            if mentor_relationship["scholar"] == scholar["name"]:
+                mentors.append(mentor_relationship["mentor"])
+        if mentors:
+            scholar["mentors"] = mentors
+    return scholars
+
+
+def write_genealogy(path: str, num_scholars: int, seed: int = 37) -> int:
+    """
+    Write a synthetic `tree.json` and `scholars.json` to `path`, in which every scholar but the
+    first has one or two mentors. Returns the number of mentor relationships.
+    """
+    rng = random.Random(seed)
+    names = [f"Scholar {i}" for i in range(num_scholars)]
+    scholar_mentors = [
+        {"scholars": [name], "mentors": [names[rng.randrange(i)] for _ in range(rng.randint(1, 2))]}
+        for i, name in enumerate(names[1:], start=1)
+    ]
+    with open(f"{path}/tree.json", "w") as f:
+        json.dump(scholar_mentors, f)
+    with open(f"{path}/scholars.json", "w") as f:
+        json.dump([{"name": name, "type": "scholar"} for name in names], f)
+    return sum(len(scholar_pair["mentors"]) for scholar_pair in scholar_mentors)
+
+
+def time_call(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 2_000, 4_000, 8_000, 100_000, 1_000_000]
+    )
+    parser.add_argument(
+        "--max-legacy",
+        type=int,
+        default=8_000,
+        help="Largest number of scholars to time the nested loop on",
+    )
+    args = parser.parse_args()
+
+    expected = pl.DataFrame(process_scholar_data_nested_loop("data"), infer_schema_length=None)
+    assert_frame_equal(process_scholar_data("data"), expected, check_column_order=False)
+    print("Both implementations give the same mentors on data/\n")
+
+    print(f"{'scholars':>10} {'relationships':>14} {'nested loop (s)':>16} {'group-by (s)':>13}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as path:
+            num_relationships = write_genealogy(path, size)
+            legacy = "skipped"
+            if size <= args.max_legacy:
+                legacy = f"{time_call(process_scholar_data_nested_loop, path):.3f}"
+            group_by = time_call(process_scholar_data, path)
+        print(f"{size:>10} {num_relationships:>14} {legacy:>16} {group_by:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
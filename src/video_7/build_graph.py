@@ -5,36 +5,63 @@ and inserts scholar data into the `Scholar` node table, labeling nobel laureates
 those who didn't win as `scholar`.
 """
 
-import json
 import shutil
+from pathlib import Path
 
 import kuzu
 import polars as pl
 
+TREE_SCHEMA = {"scholars": pl.List(pl.String), "mentors": pl.List(pl.String)}
+# Only the laureates have a category and year, which are null for the other scholars
+SCHOLARS_SCHEMA = {"name": pl.String, "type": pl.String, "category": pl.String, "year": pl.String}
 
-def process_scholar_data(path: str) -> list[dict[str, str | list[str]]]:
-    with open(f"{path}/tree.json", "r") as f:
-        scholar_mentors = json.load(f)
 
-    with open(f"{path}/scholars.json", "r") as f:
-        scholars = json.load(f)
+def scan_json(path: str, name: str, schema: dict[str, pl.DataType]) -> pl.LazyFrame:
+    """
+    Read `{name}.ndjson` or `{name}.json` from `path` straight into columns, with no Python objects.
 
-    mentor_relationships = []
-    for scholar_pair in scholar_mentors:
-        for scholar in scholar_pair["scholars"]:
-            for mentor in scholar_pair["mentors"]:
-                mentor_relationships.append({"scholar": scholar, "mentor": mentor})
+    An NDJSON file (one record per line) is scanned lazily, so that it's parsed in batches as the
+    query runs. A JSON array is parsed by Polars' native reader in one go.
+    """
+    if Path(f"{path}/{name}.ndjson").exists():
+        return pl.scan_ndjson(f"{path}/{name}.ndjson", schema=schema)
+    return pl.read_json(f"{path}/{name}.json", schema=schema).lazy()
 
-    # Add a `mentors` JSON array to each scholar in the `scholars` JSON array
-    for scholar in scholars:
-        mentors = []
-        for mentor_relationship in mentor_relationships:
-            if mentor_relationship["scholar"] == scholar["name"]:
-                mentors.append(mentor_relationship["mentor"])
-        if mentors:
-            scholar["mentors"] = mentors
 
-    return scholars
+def get_mentor_relationships(scholar_mentors: pl.LazyFrame) -> pl.LazyFrame:
+    """Flatten the entries of `tree.json` into one (scholar, mentor) row per relationship."""
+    return (
+        # Every scholar of an entry is mentored by every mentor of the entry
+        scholar_mentors.explode("scholars")
+        .explode("mentors")
+        .select(scholar="scholars", mentor="mentors")
+        .drop_nulls()
+    )
+
+
+def attach_mentors(scholars: pl.LazyFrame, mentor_relationships: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Add a `mentors` list column to the scholars, with a hash group-by and a join.
+
+    Each scholar's mentors are in the order they appear in `tree.json`. Scholars with no mentors
+    have a null `mentors` value.
+    """
+    mentors = mentor_relationships.group_by("scholar", maintain_order=True).agg(
+        mentors=pl.col("mentor")
+    )
+    return scholars.join(
+        mentors, left_on="name", right_on="scholar", how="left", maintain_order="left"
+    )
+
+
+def process_scholar_data(path: str) -> pl.DataFrame:
+    scholar_mentors = scan_json(path, "tree", TREE_SCHEMA)
+    scholars = scan_json(path, "scholars", SCHOLARS_SCHEMA)
+    # Add a `mentors` list to each scholar, grouping the relationships once rather than scanning
+    # all of them for every scholar
+    return attach_mentors(scholars, get_mentor_relationships(scholar_mentors)).collect(
+        engine="streaming"
+    )
 
 
 def create_schema(conn: kuzu.Connection) -> None:
@@ -122,8 +149,7 @@ def main() -> None:
 
     ROOT_DIR = "data"
     # Process scholar data from source files
-    scholars = process_scholar_data(ROOT_DIR)
-    df = pl.DataFrame(scholars)
+    df = process_scholar_data(ROOT_DIR)
 
     # Create the graph schema (nodes and relationships)
     create_schema(conn)